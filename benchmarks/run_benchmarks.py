@@ -0,0 +1,216 @@
+"""Time every stage of DataCleaner.clean and BioCleaner.bio_clean
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 1000 100000 --output b.json
+    python -m benchmarks.run_benchmarks --option n_jobs=8 --option ...
+
+Each stage is run on the output of the previous one, like the pipelines
+do, and reported with rows in/out, wall time, rows per second and memory.
+Memory is the process peak RSS after the stage; with --trace-memory the
+Python allocation peak of the stage is traced too (slower timings).
+"""
+import argparse
+import ast
+import functools
+import inspect
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import molvs
+import pandas as pd
+import rdkit
+from rdkit import RDLogger
+
+from benchmarks.synthetic import UNITS, bio_dataset, cleaner_dataset
+from core.code.clean_process import BioCleaner, DataCleaner
+from core.code.profiling import peak_rss_mb
+
+SIZES = [1000, 100000, 1000000]
+CONV = ["Molecular Weight", "Standard Relation", "Standard Value",
+        "Standard Units"]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks."
+                                     "run_benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--pipelines", nargs="+", default=["clean", "bio"],
+                        choices=["clean", "bio"])
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--invalid-rate", type=float, default=0.1)
+    parser.add_argument("--strains", type=int, default=5,
+                        help="Distinct strains (all but one are selected)")
+    parser.add_argument("--units", type=json.loads, default=UNITS,
+                        help='Unit mix as JSON, e.g. {"nM": 1, "uM": 1}')
+    parser.add_argument("--task", default="Classification",
+                        choices=["Classification", "Regression"])
+    parser.add_argument("--threshold", type=float, default=10000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--option", action="append", default=[],
+                        metavar="KEY=VALUE",
+                        help="Keyword argument for the cleaner "
+                        "constructors (each gets those it accepts)")
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--output", help="JSON file (default: stdout)")
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    options = _parse_options(args.option)
+
+    unknown = (set(options) - set(_options_for(DataCleaner, options))
+               - set(_options_for(BioCleaner, options)))
+    if unknown:
+        parser.error(f"unknown cleaner options: {', '.join(sorted(unknown))}")
+    RDLogger.DisableLog("rdApp.*")
+
+    results = []
+    for size in args.sizes:
+        for pipeline in args.pipelines:
+            if pipeline == "clean":
+                results += bench_clean(size, args, options)
+            else:
+                results += bench_bio(size, args, options)
+
+    report = {"meta": _meta(args, options), "results": results}
+    text = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    return 0
+
+
+def bench_clean(size, args, options):
+    data = cleaner_dataset(size, args.duplicate_rate, args.invalid_rate,
+                           seed=args.seed)
+    dclean = DataCleaner("Smiles", "Labels",
+                         **_options_for(DataCleaner, options))
+    stages = [("remove_nan", dclean.remove_nan),
+              ("filter_atoms", dclean.filter_atoms),
+              ("standardize_smiles", dclean.standardize_smiles),
+              ("remove_duplicates",
+               lambda df: dclean.remove_duplicates(df, args.task))]
+
+    return time_stages("clean", size, stages, data, args.trace_memory)
+
+
+def bench_bio(size, args, options):
+    data = bio_dataset(size, args.duplicate_rate, args.invalid_rate,
+                       args.strains, args.units, seed=args.seed)
+    strains = [f"Strain {idx}" for idx in range(max(1, args.strains - 1))]
+
+    # Stages of BioCleaner.plan, in the order bio_clean runs them
+    bclean = BioCleaner("Smiles", "Assay Organism", CONV,
+                        **_options_for(BioCleaner, options))
+    stages = [(name, functools.partial(_call, func, args))
+              for name, func, args in bclean.plan(bclean.data_cleaner(),
+                                                  strains, args.threshold)]
+
+    return time_stages("bio", size, stages, data, args.trace_memory)
+
+
+def time_stages(pipeline, size, stages, dataframe, trace_memory=False):
+    """Run stages in sequence and measure each one
+
+    Args:
+        pipeline (str): Pipeline name
+        size (int): Dataset size
+        stages (list): (name, function) pairs
+        dataframe (pd.DataFrame): Input of the first stage
+        trace_memory (bool, optional): Trace Python allocation peaks.
+
+    Returns:
+        list: One result dict per stage, plus a "total" entry
+    """
+    results = []
+    df = dataframe
+
+    for name, func in stages:
+        rows_in = len(df)
+        if trace_memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        df = func(df)
+        seconds = time.perf_counter() - start
+
+        peak_traced = None
+        if trace_memory:
+            peak_traced = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+
+        results.append({"pipeline": pipeline, "size": size, "stage": name,
+                        "rows_in": rows_in, "rows_out": len(df),
+                        "seconds": seconds,
+                        "rows_per_second": _rate(rows_in, seconds),
+                        "max_rss_mb": peak_rss_mb(),
+                        "peak_traced_mb": peak_traced})
+
+    seconds = sum(result["seconds"] for result in results)
+    results.append({"pipeline": pipeline, "size": size, "stage": "total",
+                    "rows_in": len(dataframe), "rows_out": len(df),
+                    "seconds": seconds,
+                    "rows_per_second": _rate(len(dataframe), seconds),
+                    "max_rss_mb": peak_rss_mb(),
+                    "peak_traced_mb": None})
+
+    return results
+
+
+def _call(func, args, dataframe):
+    return func(dataframe, *args)
+
+
+def _rate(rows, seconds):
+    return rows / seconds if seconds > 0 else None
+
+
+def _parse_options(items):
+    options = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        try:
+            options[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            options[key] = value
+
+    return options
+
+
+def _options_for(cleaner, options):
+    # Options are shared by both cleaners, each gets the ones it accepts
+    params = inspect.signature(cleaner).parameters
+
+    return {key: value for key, value in options.items() if key in params}
+
+
+def _meta(args, options):
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pandas": pd.__version__,
+            "rdkit": rdkit.__version__,
+            "molvs": molvs.__version__,
+            "duplicate_rate": args.duplicate_rate,
+            "invalid_rate": args.invalid_rate,
+            "strains": args.strains,
+            "units": args.units,
+            "task": args.task,
+            "threshold": args.threshold,
+            "seed": args.seed,
+            "options": options}
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Reproducible synthetic datasets for benchmarking the cleaners
+
+Molecules are assembled from ring templates, branches and linkers, so
+every generated Smiles is valid and most are distinct. All randomness
+comes from a seeded numpy Generator.
+"""
+import numpy as np
+import pandas as pd
+
+RINGS = ["c1ccc({})cc1", "c1cnc({})cc1", "C1CCC({})CC1", "N1CCN({})CC1",
+         "c1ccc2cc({})ccc2c1"]
+BRANCHES = ["C", "O", "N", "F", "Cl", "Br", "I", "OC", "C(=O)O", "C#N",
+            "S(C)(=O)=O", "N(C)C", "[N+](=O)[O-]", "CCO", "C(F)(F)F"]
+PREFIXES = ["", "C", "CC", "OC", "CC(C)", "NC(=O)", "O=C(O)", "ClC",
+            "CN(C)", "FC(F)(F)"]
+LINKERS = ["", "C", "O", "N", "CC", "C(=O)N", "S", "OCC"]
+SUFFIXES = ["", "C", "O", "N", "F", "Cl", "C(=O)N", "OCC", "CC(=O)O"]
+
+# Disconnected fragments with atoms outside VALID_ATOMS
+INVALID = [".[Na+]", ".[K+]", ".[Pt]", ".C[Si](C)(C)C", ".OB(O)O", ".C[Se]C"]
+
+UNITS = {"nM": 0.4, "uM": 0.2, "ug.mL-1": 0.3, "%": 0.05, "mg.kg-1": 0.05}
+RELATIONS = {"'='": 0.7, "'>'": 0.15, "'<'": 0.1, "'>='": 0.05}
+
+
+def random_smiles(rng, n_molecules, invalid_rate=0.0):
+    """Generate valid Smiles, some with atoms outside VALID_ATOMS
+
+    Args:
+        rng (np.random.Generator): Random generator
+        n_molecules (int): Number of Smiles
+        invalid_rate (float, optional): Fraction with invalid atoms.
+
+    Returns:
+        list: Smiles
+    """
+    smiles = []
+    two_rings = rng.random(n_molecules) < 0.7
+    invalid = rng.random(n_molecules) < invalid_rate
+
+    for idx in range(n_molecules):
+        parts = [_pick(rng, PREFIXES), _ring(rng)]
+        if two_rings[idx]:
+            parts += [_pick(rng, LINKERS), _ring(rng)]
+        parts.append(_pick(rng, SUFFIXES))
+        if invalid[idx]:
+            parts.append(_pick(rng, INVALID))
+
+        smiles.append("".join(parts))
+
+    return smiles
+
+
+def cleaner_dataset(n_rows, duplicate_rate=0.2, invalid_rate=0.1, seed=0):
+    """Dataset for DataCleaner.clean (Smiles, ID, Labels)
+
+    Args:
+        n_rows (int): Number of rows
+        duplicate_rate (float, optional): Fraction of repeated Smiles.
+        invalid_rate (float, optional): Fraction with invalid atoms.
+        seed (int, optional): Random seed.
+
+    Returns:
+        pd.DataFrame: Dataset
+    """
+    rng = np.random.default_rng(seed)
+    smiles = _with_duplicates(rng, n_rows, duplicate_rate, invalid_rate)
+
+    return pd.DataFrame({"Smiles": smiles,
+                         "ID": np.arange(n_rows),
+                         "Labels": rng.integers(0, 2, n_rows)})
+
+
+def bio_dataset(n_rows, duplicate_rate=0.2, invalid_rate=0.1, n_strains=5,
+                units=None, seed=0):
+    """Dataset for BioCleaner.bio_clean, with ChEMBL column names
+
+    Args:
+        n_rows (int): Number of rows
+        duplicate_rate (float, optional): Fraction of repeated Smiles.
+        invalid_rate (float, optional): Fraction with invalid atoms.
+        n_strains (int, optional): Number of distinct strains.
+        units (dict, optional): Unit -> frequency. Defaults to UNITS.
+        seed (int, optional): Random seed.
+
+    Returns:
+        pd.DataFrame: Dataset
+    """
+    rng = np.random.default_rng(seed)
+    units = UNITS if units is None else units
+    smiles = _with_duplicates(rng, n_rows, duplicate_rate, invalid_rate)
+
+    return pd.DataFrame({
+        "Molecule ChEMBL ID": [f"CHEMBL{idx}" for idx in range(n_rows)],
+        "Molecular Weight": np.round(rng.uniform(150, 800, n_rows), 2),
+        "Smiles": smiles,
+        "Standard Relation": _choice(rng, RELATIONS, n_rows),
+        "Standard Value": np.round(rng.lognormal(8, 2.5, n_rows), 3),
+        "Standard Units": _choice(rng, units, n_rows),
+        "Assay Organism": rng.choice([f"Strain {idx}"
+                                      for idx in range(n_strains)], n_rows)})
+
+
+def _with_duplicates(rng, n_rows, duplicate_rate, invalid_rate):
+    n_unique = max(1, int(round(n_rows * (1 - duplicate_rate))))
+    unique = np.array(random_smiles(rng, n_unique, invalid_rate),
+                      dtype=object)
+    picks = np.concatenate([np.arange(n_unique),
+                            rng.integers(0, n_unique, n_rows - n_unique)])
+
+    return unique[rng.permutation(picks)]
+
+
+def _ring(rng):
+    return _pick(rng, RINGS).format(_pick(rng, BRANCHES))
+
+
+def _pick(rng, items):
+    return items[rng.integers(len(items))]
+
+
+def _choice(rng, weights, size):
+    names = list(weights)
+    p = np.array([weights[name] for name in names], dtype=float)
+
+    return rng.choice(names, size, p=p / p.sum())
@@ -1,25 +1,22 @@
-import os
 import streamlit as st
-from rdkit.Chem import PandasTools
 
-from core.code.streamlit_structure import Sidebar, Body, Misc
+from core.code.streamlit_structure import CORPUS, Sidebar, Body, Misc
 from core.code.clean_process import BioCleaner
+from core.code.profiling import StageProfiler
+from core.code.structure_index import StructureIndex
 
 EXAMPLE = "./core/files/example_biocleaner.csv"
-SDF_OUT = "./core/files/out_sdf.sdf"
+PAGE = "bio_cleaner"
 
 
 def bio_cleaner():
     uploaded_file = None
     uploaded_file = Sidebar.file_uploader("Upload data",
-                                          "Upload CSV or SDF file",
+                                          "Upload CSV, SDF, Parquet or "
+                                          "Arrow file",
                                           EXAMPLE)
 
     if uploaded_file:
-        # Delete SDF from lib folder
-        if os.path.exists(SDF_OUT):
-            os.remove(SDF_OUT)
-
         # Load data
         file_name = uploaded_file.name.split(".")[0]
         data = Misc.load_csv_sdf(uploaded_file)
@@ -31,9 +28,17 @@ def bio_cleaner():
                      " (IN THIS ORDER)")
         col_conv = Sidebar.multicolumn_selector(data, conv_text)
         col_strn = Sidebar.column_selector(data, "Select :red[Strain] column")
-        strains = Sidebar.strain_selector(data, col_strn)
+        strains = Sidebar.strain_selector(data, col_strn,
+                                          Misc.file_key(uploaded_file))
         thrd = st.sidebar.number_input("**Activity threshold value (nM)**",
                                        value=10000.0)
+        fmt = Sidebar.format_selector()
+        compression = Sidebar.compression_selector()
+
+        corpus_mode, corpus_version = None, None
+        if CORPUS:
+            corpus_mode = Sidebar.corpus_mode_selector()
+            corpus_version = StructureIndex(CORPUS).version()
 
         # Set displays placeholders
         info_up = st.empty()
@@ -43,37 +48,51 @@ def bio_cleaner():
 
         # Display input data
         title.subheader("Input")
-        data_disp.dataframe(data)
+        Body.data_preview(data_disp, data, f"{PAGE}_input",
+                          Misc.file_key(uploaded_file))
         info_down.info(f"Input shape: {data.shape}")
 
         if len(strains) > 0:
-            if st.sidebar.button("Run"):
-                with st.spinner("Please wait"):
-                    # Run processing
-                    dclean = BioCleaner(col_smls, col_strn, col_conv)
-                    output = dclean.bio_clean(data, strains, thrd)
-
-                # Display output data
-                title.subheader("Output")
-                data_disp.dataframe(output)
-                info_up.info(f"Input shape: {data.shape}")
-                info_down.info(f"Output shape: {output.shape}")
-
-                Misc.download_data(output, file_name,
-                                   disp_text="Download CSV")
-
-                # Download SDF
-                output_sdf = output.copy(deep=True)
-                PandasTools.AddMoleculeColumnToFrame(output_sdf,
-                                                     col_smls,
-                                                     "ROMol")
-                PandasTools.WriteSDF(output_sdf, SDF_OUT,
-                                     molColName="ROMol",
-                                     idName="RowID",
-                                     properties=list(output_sdf.columns))
-                with open(SDF_OUT, "rb") as sdf:
-                    st.download_button("Download SDF", sdf,
-                                       file_name=f"{file_name}.sdf")
+            params = (Misc.file_key(uploaded_file), col_smls, col_strn,
+                      tuple(col_conv), tuple(strains), thrd, corpus_mode,
+                      corpus_version)
+            if Sidebar.run_button(params, "bio_cleaner_run"):
+                # Run processing in the background (one job per file and
+                # params)
+                job = Misc.submit_job(PAGE, params, file_name,
+                                      _run_bio_cleaner, *params, data)
+                result = Body.job_progress(job, "bio_cleaner_run")
+
+                if result is not None:
+                    # Display output data
+                    title.subheader("Output")
+                    info_up.info(f"Input shape: {data.shape}")
+                    Body.job_result(result, job, PAGE, fmt, compression,
+                                    data_disp, info_down)
 
     else:
-        Body.awating_upload()
+        # Reconnect to a job started before the page was reloaded
+        job = Misc.followed_job(PAGE)
+
+        if job is None:
+            Body.awating_upload()
+        else:
+            fmt = Sidebar.format_selector()
+            compression = Sidebar.compression_selector()
+            st.subheader(f"Output: {job.name}")
+            result = Body.job_progress(job)
+
+            if result is not None:
+                Body.job_result(result, job, PAGE, fmt, compression,
+                                st.empty(), st.empty())
+
+
+def _run_bio_cleaner(file_key, col_smls, col_strn, col_conv, strains, thrd,
+                     corpus_mode, corpus_version, data, job):
+    profiler = StageProfiler()
+    dclean = BioCleaner(col_smls, col_strn, list(col_conv),
+                        **Misc.cleaner_options(corpus_mode,
+                                               [profiler, job]))
+    output = dclean.bio_clean(data, list(strains), thrd)
+
+    return Misc.cleaner_result(dclean, output, col_smls, profiler)
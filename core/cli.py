@@ -0,0 +1,406 @@
+"""Command-line entry point for the cleaning pipelines (no Streamlit)
+
+Usage:
+    python -m core clean INPUT OUTPUT --smiles Smiles --label Labels
+    python -m core bio-clean INPUT OUTPUT --strains "Escherichia coli"
+    python -m core bio-clean "campaign/*.sdf" OUTPUT_DIR --batch-jobs 8
+    python -m core compare-backends INPUT [DIFFERENCES] --smiles Smiles
+"""
+import argparse
+import functools
+import os
+import sys
+
+import pandas as pd
+
+from core.code.batch import (SUMMARY_NAME, batch_inputs, is_batch,
+                             output_path, run_batch)
+from core.code.checkpoint import PipelineCheckpoint
+from core.code.clean_process import BioCleaner, DataCleaner
+from core.code.compression import file_compression, strip_compression
+from core.code.file_io import EXTENSIONS, file_format, read_table, write_table
+from core.code.profiling import StageProfiler
+from core.code.standardize import BACKENDS, CHUNK_SIZE, compare_backends
+from core.code.stdz_cache import StandardizationCache
+from core.code.streaming import CHUNK_ROWS, StreamCleaner
+from core.code.structure_index import CORPUS_MODES, StructureIndex
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m core",
+        description="Clean molecular datasets without the Streamlit UI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    clean = commands.add_parser("clean", help="Run the Dataset Cleaner")
+    _add_common(clean)
+    clean.add_argument("--label", default="Labels", help="Label column")
+    clean.add_argument("--task", default="Classification",
+                       choices=["Classification", "Regression"])
+    clean.add_argument("--stream", action="store_true",
+                       help="Process a CSV or SDF in chunks of --stream-rows "
+                       "rows")
+    clean.add_argument("--stream-rows", type=int, default=CHUNK_ROWS)
+
+    bio = commands.add_parser("bio-clean", help="Run the Dataset Bio-Cleaner")
+    _add_common(bio)
+    bio.add_argument("--weight", default="Molecular Weight",
+                     help="Molecular weight column")
+    bio.add_argument("--relation", default="Standard Relation",
+                     help="Standard relation column")
+    bio.add_argument("--value", default="Standard Value",
+                     help="Standard value column")
+    bio.add_argument("--units", default="Standard Units",
+                     help="Standard units column")
+    bio.add_argument("--strain-column", default="Assay Organism",
+                     help="Strain column")
+    bio.add_argument("--strains", nargs="+",
+                     help="Strains to keep (default: all)")
+    bio.add_argument("--threshold", type=float, default=10000.0,
+                     help="Activity threshold value (nM)")
+
+    compare = commands.add_parser(
+        "compare-backends",
+        help="List the Smiles standardized differently by each backend")
+    compare.add_argument("input", help="Input table (any supported format)")
+    compare.add_argument("output", nargs="?",
+                         help="Write the differing Smiles to this table")
+    compare.add_argument("--smiles", default="Smiles", help="Smiles column")
+    compare.add_argument("--n-jobs", type=int, default=1,
+                         help="Standardization processes (< 1: all cores)")
+    compare.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                         help="Molecules per standardization task")
+
+    return parser
+
+
+def main(argv=None):
+    """Run a cleaning job and return its exit code
+
+    Args:
+        argv (list, optional): Arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: 0 on success, 1 on processing errors, 2 on usage errors
+    """
+    args = build_parser().parse_args(argv)
+    batch = args.command != "compare-backends" and is_batch(args.input)
+
+    # Batch workers open the cache themselves
+    cache = None
+    if getattr(args, "cache", None) and not batch:
+        cache = StandardizationCache(args.cache)
+
+    profiler = StageProfiler()
+
+    try:
+        if args.command == "compare-backends":
+            code = _run_compare(args)
+        elif batch:
+            code = _run_batch(args, profiler)
+        elif args.command == "clean" and args.stream:
+            code = _run_stream(args, cache, [profiler])
+        else:
+            code = _run(args, cache, [profiler])
+
+        if getattr(args, "report", None) and code == EXIT_OK:
+            profiler.to_json(args.report)
+
+    except Exception as error:
+        print(f"error: {type(error).__name__}: {error}", file=sys.stderr)
+        code = EXIT_ERROR
+
+    if cache is not None:
+        stats = cache.stats()
+        print(f"cache: {stats['hits']} hits, {stats['misses']} misses",
+              file=sys.stderr)
+        cache.close()
+
+    return code
+
+
+def _add_common(parser):
+    parser.add_argument("input",
+                        help="Input CSV, SDF, Parquet or Arrow file "
+                        "(optionally .gz, .bz2, .zst or .zip), or a "
+                        "directory or quoted glob of them (batch mode)")
+    parser.add_argument("output",
+                        help="Output CSV, SDF, Parquet or Arrow file "
+                        "(optionally .gz, .bz2, .zst or .zip), or the "
+                        "output directory in batch mode")
+    parser.add_argument("--smiles", default="Smiles", help="Smiles column")
+    parser.add_argument("--n-jobs", type=int, default=1,
+                        help="Standardization processes (< 1: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Molecules per standardization task")
+    parser.add_argument("--cache", help="Standardization cache (SQLite)")
+    parser.add_argument("--backend", default="molvs", choices=BACKENDS,
+                        help="Standardizer: molvs (reference) or rdkit "
+                        "(faster, native RDKit)")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="Time limit to standardize one molecule; "
+                        "slower molecules are stopped and quarantined")
+    parser.add_argument("--quarantine", metavar="FILE",
+                        help="Table of the quarantined molecules (default: "
+                        "OUTPUT name + .quarantine.csv)")
+    parser.add_argument("--lean", action="store_true",
+                        help="Low-memory mode: stages copy only the columns "
+                        "they use, low-cardinality text columns become "
+                        "categorical")
+    parser.add_argument("--checkpoint", metavar="DIR",
+                        help="Save stage outputs in DIR and resume from them")
+    parser.add_argument("--corpus", metavar="INDEX",
+                        help="Structure index (.npy) of an existing corpus")
+    parser.add_argument("--corpus-mode", default="flag", choices=CORPUS_MODES,
+                        help="Flag or drop rows already in the corpus")
+    parser.add_argument("--update-corpus", action="store_true",
+                        help="Add the new structures to the corpus index")
+    parser.add_argument("--report",
+                        help="Write the per-stage report (JSON) to this file")
+    parser.add_argument("--batch-jobs", type=int, default=1,
+                        help="Batch mode: files cleaned at once, one process "
+                        "each (< 1: all cores)")
+    parser.add_argument("--batch-format", default="csv",
+                        choices=list(EXTENSIONS),
+                        help="Batch mode: format of the output files")
+
+
+def _run(args, cache, hooks):
+    data = _read_input(args, args.input)
+
+    missing = _missing_columns(args, data)
+    if missing:
+        print(f"error: missing columns: {', '.join(missing)}",
+              file=sys.stderr)
+        return EXIT_USAGE
+
+    result = _clean_data(args, data, args.output, cache, hooks)
+    _report(result["rows_in"], result["rows_out"], result["errors"],
+            result["quarantined"])
+    if result["resumed"]:
+        print(f"checkpoint: resumed {', '.join(result['resumed'])}",
+              file=sys.stderr)
+
+    return EXIT_OK
+
+
+def _run_batch(args, profiler):
+    if args.command == "clean" and args.stream:
+        print("error: --stream cannot be used in batch mode",
+              file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.update_corpus and args.batch_jobs != 1:
+        print("error: --update-corpus needs --batch-jobs 1",
+              file=sys.stderr)
+        return EXIT_USAGE
+
+    inputs = batch_inputs(args.input)
+    if not inputs:
+        print(f"error: no input files in {args.input}", file=sys.stderr)
+        return EXIT_USAGE
+
+    os.makedirs(args.output, exist_ok=True)
+    outputs = {path: output_path(path, args.output, args.batch_format)
+               for path in inputs}
+    if len(set(outputs.values())) < len(outputs):
+        print("error: input files with the same name would share an output",
+              file=sys.stderr)
+        return EXIT_USAGE
+
+    summary = []
+    for path, result, error, seconds in run_batch(
+            functools.partial(_clean_file, args, outputs), inputs,
+            args.batch_jobs):
+        row = {"Input": path, "Output": outputs[path],
+               "Status": "failed" if error else "done", "Error": error,
+               "Rows in": None, "Rows out": None, "Not standardized": None,
+               "Quarantined": None, "Cache hits": None, "Cache misses": None,
+               "Seconds": round(seconds, 3)}
+
+        if error is None:
+            profiler.records.extend(result["records"])
+            row.update({"Rows in": result["rows_in"],
+                        "Rows out": result["rows_out"],
+                        "Not standardized": result["errors"],
+                        "Quarantined": result["quarantined"],
+                        "Cache hits": result["cache"]["hits"],
+                        "Cache misses": result["cache"]["misses"]})
+
+        summary.append(row)
+        print(f"{row['Status']}: {path}" + (f" ({error})" if error else ""),
+              file=sys.stderr)
+
+    summary = pd.DataFrame(summary).astype({
+        col: "Int64" for col in ["Rows in", "Rows out", "Not standardized",
+                                 "Quarantined", "Cache hits",
+                                 "Cache misses"]})
+    summary.to_csv(os.path.join(args.output, SUMMARY_NAME), index=False)
+
+    failed = (summary["Status"] == "failed").sum()
+    print(f"batch: {len(summary) - failed} files done, {failed} failed, "
+          f"{summary['Rows in'].sum()} rows in, "
+          f"{summary['Rows out'].sum()} out", file=sys.stderr)
+
+    return EXIT_ERROR if failed else EXIT_OK
+
+
+def _clean_file(args, outputs, input_path):
+    # Runs in a batch worker: one cache connection per process, all on
+    # the same SQLite file
+    cache = None
+    if args.cache:
+        cache = StandardizationCache(args.cache)
+
+    profiler = StageProfiler()
+
+    try:
+        data = _read_input(args, input_path)
+
+        missing = _missing_columns(args, data)
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(missing)}")
+
+        result = _clean_data(args, data, outputs[input_path], cache,
+                             [profiler])
+
+    finally:
+        stats = {"hits": None, "misses": None}
+        if cache is not None:
+            stats = cache.stats()
+            cache.close()
+
+    result.update({"cache": stats, "records": profiler.records})
+
+    return result
+
+
+def _read_input(args, path):
+    return read_table(path, file_format(path), n_jobs=args.n_jobs,
+                      compression=file_compression(path))
+
+
+def _missing_columns(args, data):
+    if args.command == "clean":
+        columns = [args.smiles, args.label]
+    else:
+        columns = [args.smiles, args.strain_column] + _col_conv(args)
+
+    return [col for col in columns if col not in data.columns]
+
+
+def _clean_data(args, data, output, cache, hooks):
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint = PipelineCheckpoint(args.checkpoint)
+
+    if args.command == "clean":
+        dclean = DataCleaner(args.smiles, args.label, n_jobs=args.n_jobs,
+                             chunk_size=args.chunk_size, cache=cache,
+                             hooks=hooks, checkpoint=checkpoint,
+                             backend=args.backend, lean=args.lean,
+                             timeout=args.timeout, **_corpus_options(args))
+        df = dclean.clean(data, args.task)
+    else:
+        strains = args.strains
+        if strains is None:
+            strains = list(data[args.strain_column].unique())
+
+        dclean = BioCleaner(args.smiles, args.strain_column, _col_conv(args),
+                            n_jobs=args.n_jobs, chunk_size=args.chunk_size,
+                            cache=cache, hooks=hooks, checkpoint=checkpoint,
+                            backend=args.backend, lean=args.lean,
+                            timeout=args.timeout, **_corpus_options(args))
+        df = dclean.bio_clean(data, strains, args.threshold)
+
+    write_table(df, output, args.smiles,
+                dclean.store.molecules_of(df[args.smiles]), args.n_jobs)
+    _write_quarantine(args, dclean.quarantine, output)
+
+    resumed = []
+    if checkpoint is not None:
+        resumed = checkpoint.resumed
+
+    return {"rows_in": len(data), "rows_out": len(df),
+            "errors": len(dclean.errors),
+            "quarantined": len(dclean.quarantine), "resumed": resumed}
+
+
+def _col_conv(args):
+    return [args.weight, args.relation, args.value, args.units]
+
+
+def _run_stream(args, cache, hooks):
+    if (file_format(args.input) not in ["csv", "sdf"] or
+            file_format(args.output) != "csv"):
+        print("error: --stream reads CSV or SDF and writes CSV only",
+              file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.checkpoint:
+        print("error: --checkpoint cannot be used with --stream",
+              file=sys.stderr)
+        return EXIT_USAGE
+
+    dclean = DataCleaner(args.smiles, args.label, n_jobs=args.n_jobs,
+                         chunk_size=args.chunk_size, cache=cache,
+                         hooks=hooks, backend=args.backend,
+                         timeout=args.timeout, **_corpus_options(args))
+    stream = StreamCleaner(dclean, chunk_size=args.stream_rows)
+    stream.clean(args.input, args.output, args.task)
+    _write_quarantine(args, stream.quarantine, args.output)
+    _report(stream.rows_in, stream.rows_out, len(stream.errors),
+            len(stream.quarantine))
+
+    return EXIT_OK
+
+
+def _run_compare(args):
+    data = read_table(args.input, file_format(args.input),
+                      columns=[args.smiles], n_jobs=args.n_jobs,
+                      compression=file_compression(args.input))
+
+    differences = compare_backends(data[args.smiles].dropna(),
+                                   n_jobs=args.n_jobs,
+                                   chunk_size=args.chunk_size)
+    print(f"backends: {data[args.smiles].nunique()} Smiles compared, "
+          f"{len(differences)} differ", file=sys.stderr)
+
+    if args.output:
+        write_table(differences, args.output, "Smiles")
+
+    return EXIT_OK
+
+
+def _corpus_options(args):
+    corpus = None
+    if args.corpus:
+        corpus = StructureIndex(args.corpus)
+
+    return {"corpus": corpus, "corpus_mode": args.corpus_mode,
+            "update_corpus": args.update_corpus}
+
+
+def _write_quarantine(args, quarantine, output):
+    # Written only when a molecule timed out, with its input row number
+    if len(quarantine) == 0:
+        return
+
+    path = args.quarantine
+    if path is None or is_batch(args.input):
+        stem = os.path.splitext(strip_compression(output))[0]
+        path = f"{stem}.quarantine.csv"
+
+    write_table(quarantine.round({"Seconds": 3}).rename_axis("Row")
+                .reset_index(), path)
+    print(f"quarantine: {len(quarantine)} molecules over {args.timeout} s "
+          f"written to {path}", file=sys.stderr)
+
+
+def _report(rows_in, rows_out, errors, quarantined=0):
+    print(f"rows: {rows_in} in, {rows_out} out, {errors} not "
+          f"standardized, {quarantined} quarantined", file=sys.stderr)
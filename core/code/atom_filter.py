@@ -0,0 +1,112 @@
+import re
+
+from rdkit import Chem
+
+# Bracket atoms, the organic subset (two-letter symbols first) and any
+# other letter, which is not an atom and makes the Smiles unparsable
+TOKENS = re.compile(r"\[[^\]]*\]|Cl|Br|[A-Za-z*]")
+BRACKET_ATOM = re.compile(r"\[\d*(se|as|te|[A-Z][a-z]?|[a-z]|\*)")
+ORGANIC = {"B", "C", "N", "O", "P", "S", "F", "Cl", "Br", "I",
+           "b", "c", "n", "o", "p", "s", "*"}
+
+
+class AtomFilter:
+    """Atom whitelist check with cheap rejections before parsing
+
+    Smiles are first scanned token by token: any element outside the
+    whitelist, or fewer than two heavy atoms, rejects the row without
+    parsing. Smiles the scan cannot read are parsed without sanitization
+    and checked by atomic number. Only rows that pass both need the full
+    (sanitized) molecule, which decides parse errors and explicit H.
+    """
+
+    def __init__(self, valid_atoms):
+        table = Chem.GetPeriodicTable()
+        self.symbols = set(valid_atoms)
+        self.numbers = {table.GetAtomicNumber(atom) for atom in valid_atoms}
+
+    def prefilter(self, smiles):
+        """Check a Smiles without the full parse
+
+        Args:
+            smiles (str): Smiles
+
+        Returns:
+            bool: False if it fails the filter, True if it needs the full
+            molecule to decide
+        """
+        passed = self.scan(smiles)
+
+        if passed is None:
+            passed = self._check_unsanitized(smiles)
+
+        return passed
+
+    def scan(self, smiles):
+        """Token scan of a Smiles
+
+        Args:
+            smiles (str): Smiles
+
+        Returns:
+            bool: False if rejected, True if passed, None if not scanned
+        """
+        if not smiles or any(char.isspace() for char in smiles):
+            return None
+
+        heavy = 0
+        for token in TOKENS.findall(smiles):
+            if token[0] == "[":
+                match = BRACKET_ATOM.match(token)
+                if match is None:
+                    return None
+                symbol = match.group(1).capitalize()
+
+            elif token in ORGANIC:
+                symbol = token.capitalize()
+
+            else:
+                return False
+
+            # Explicit H may be removed by the parser: decided later
+            if symbol == "H":
+                continue
+            if symbol not in self.symbols:
+                return False
+            heavy += 1
+
+        return heavy >= 2
+
+    def is_valid(self, mol):
+        """Full check of a sanitized molecule
+
+        Args:
+            mol (Chem.Mol): Molecule (None if invalid)
+
+        Returns:
+            bool: True if it has two or more atoms, all whitelisted
+        """
+        if mol is None or mol.GetNumAtoms() < 2:
+            return False
+
+        for atom in mol.GetAtoms():
+            if atom.GetAtomicNum() not in self.numbers:
+                return False
+
+        return True
+
+    def _check_unsanitized(self, smiles):
+        mol = Chem.MolFromSmiles(smiles, sanitize=False)
+        if mol is None:
+            return False
+
+        heavy = 0
+        for atom in mol.GetAtoms():
+            number = atom.GetAtomicNum()
+            if number == 1:
+                continue
+            if number not in self.numbers:
+                return False
+            heavy += 1
+
+        return heavy >= 2
@@ -0,0 +1,109 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.code.compression import strip_compression
+from core.code.file_io import EXTENSIONS, FORMATS
+from core.code.standardize import n_workers
+
+GLOB_CHARS = "*?["
+SUMMARY_NAME = "summary.csv"
+
+
+def is_batch(source):
+    """Check if an input names several files (a directory or a glob)
+
+    Args:
+        source (str): Input path or pattern
+
+    Returns:
+        bool: True for a directory or a glob pattern
+    """
+    return os.path.isdir(source) or any(char in source
+                                        for char in GLOB_CHARS)
+
+
+def batch_inputs(source):
+    """Tables of a directory or matching a glob, largest first
+
+    Files are kept if their extension (after removing any compression
+    extension) is a supported table format, e.g. "dir/*" skips notes.
+
+    Args:
+        source (str): Directory or glob pattern
+
+    Returns:
+        list: File paths, by decreasing size
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+
+    paths = [path for path in paths
+             if os.path.isfile(path) and _extension(path) in FORMATS]
+
+    # Largest first: long files start early and small ones fill the gaps
+    return sorted(paths, key=lambda path: (-os.path.getsize(path), path))
+
+
+def output_path(input_path, output_dir, fmt):
+    """Output path of a batch input
+
+    Args:
+        input_path (str): Input file, e.g. "in/target.sdf.gz"
+        output_dir (str): Output directory
+        fmt (str): Output format
+
+    Returns:
+        str: e.g. "out/target.csv"
+    """
+    name = os.path.basename(strip_compression(input_path))
+    stem = os.path.splitext(name)[0]
+
+    return os.path.join(output_dir, f"{stem}{EXTENSIONS[fmt]}")
+
+
+def run_batch(func, inputs, n_jobs=1):
+    """Run func(input) for every input on a process pool
+
+    Inputs are submitted in the given order (largest first, see
+    batch_inputs). A failing file does not stop the others.
+
+    Args:
+        func (callable): Picklable function of one input path
+        inputs (list): Input paths
+        n_jobs (int, optional): Worker processes, < 1 uses all cores.
+
+    Yields:
+        tuple: (input, result, error, seconds) in completion order; error
+        is None on success, result is None on failure
+    """
+    n_jobs = min(n_workers(n_jobs), max(len(inputs), 1))
+
+    if n_jobs == 1:
+        for path in inputs:
+            yield (path,) + _timed(func, path)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+        futures = {ex.submit(_timed, func, path): path for path in inputs}
+
+        for future in as_completed(futures):
+            yield (futures[future],) + future.result()
+
+
+def _timed(func, path):
+    start = time.perf_counter()
+
+    try:
+        result, error = func(path), None
+    except Exception as exc:
+        result, error = None, f"{type(exc).__name__}: {exc}"
+
+    return result, error, time.perf_counter() - start
+
+
+def _extension(name):
+    return os.path.splitext(strip_compression(name))[1].lower()
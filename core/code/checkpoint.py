@@ -0,0 +1,142 @@
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+
+class PipelineCheckpoint:
+    """Stage outputs of cleaning runs, saved in a local directory
+
+    The key of a stage chains the key of its input with the stage name
+    and parameters; the first key hashes the input data and the column
+    configuration. A rerun with the same inputs loads every completed
+    stage instead of running it, and a changed parameter only reruns the
+    stages from there on. Row-wise stages (standardization) keep their
+    results per row instead, keyed by the run input only, so they are
+    reused whatever the earlier stages selected.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.root = None
+        self.resumed = []
+        self._last = None
+
+    def begin(self, dataframe, config):
+        """Start a run
+
+        Args:
+            dataframe (pd.DataFrame): Run input
+            config (tuple): Columns and options the results depend on
+        """
+        self.root = _digest(_frame_digest(dataframe), repr(config))
+        self.resumed = []
+        self._last = (dataframe, self.root)
+
+    def run(self, name, func, dataframe, *args):
+        """Load a stage output, or run the stage and save its output
+
+        Args:
+            name (str): Stage name
+            func (callable): Stage, called as func(dataframe, *args)
+            dataframe (pd.DataFrame): Stage input
+
+        Returns:
+            pd.DataFrame: Stage output
+        """
+        key = _digest(self._key_of(dataframe), name, repr(args))
+        path = self._path(key)
+
+        df = _load(path)
+        if df is not None:
+            self.resumed.append(name)
+        else:
+            df = func(dataframe, *args)
+            _save(df, path)
+
+        self._last = (df, key)
+
+        return df
+
+    def link(self, name, dataframe, output, *args):
+        """Chain the output of a row-wise stage to its input
+
+        Args:
+            name (str): Stage name
+            dataframe (pd.DataFrame): Stage input
+            output (pd.DataFrame): Stage output
+            *args: What else the output depends on
+        """
+        self._last = (output, _digest(self._key_of(dataframe), name,
+                                      repr(args)))
+
+    def load_rows(self, name):
+        """Saved per-row results of a row-wise stage
+
+        Args:
+            name (str): Stage name
+
+        Returns:
+            dict: Row key -> result (empty if nothing is saved)
+        """
+        rows = _load(self._path(_digest(self.root, name), ".rows"))
+
+        return rows if rows is not None else {}
+
+    def save_rows(self, name, rows):
+        """Save the per-row results of a row-wise stage
+
+        Args:
+            name (str): Stage name
+            rows (dict): Row key -> result
+        """
+        _save(rows, self._path(_digest(self.root, name), ".rows"))
+
+    def _key_of(self, dataframe):
+        if self._last is not None and dataframe is self._last[0]:
+            return self._last[1]
+
+        return _digest(self.root, _frame_digest(dataframe))
+
+    def _path(self, key, suffix=""):
+        return os.path.join(self.directory, f"{key}{suffix}.pkl")
+
+
+def _digest(*parts):
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(str(part).encode("utf-8"))
+        hasher.update(b"\0")
+
+    return hasher.hexdigest()
+
+
+def _frame_digest(dataframe):
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr(list(zip(dataframe.columns,
+                                map(str, dataframe.dtypes)))).encode())
+    hasher.update(pd.util.hash_pandas_object(dataframe, index=True)
+                  .to_numpy().tobytes())
+
+    return hasher.hexdigest()
+
+
+def _load(path):
+    try:
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    except Exception:
+        # Missing, truncated or otherwise unreadable files are ignored:
+        # the stage runs again and saves a new file
+        return None
+
+
+def _save(data, path):
+    # Write then rename, so an interrupted run never leaves a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
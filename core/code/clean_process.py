@@ -1,16 +1,47 @@
+import functools
+
 import numpy as np
 import pandas as pd
-from rdkit import Chem
-from molvs import Standardizer
+
+from core.code.atom_filter import AtomFilter
+from core.code.molecules import MoleculeStore
+from core.code.profiling import report_progress, run_stage
+from core.code.standardize import CHUNK_SIZE, Timeout, standardize_mols
 
 VALID_ATOMS = ["C", "O", "N", "S", "P", "F", "I", "Br", "Cl"]
 VALID_UNITS = ["ug.mL-1", "nM", "uM"]
+ATOM_FILTER = AtomFilter(VALID_ATOMS)
+CORPUS_COLUMN = "In Corpus"
+ROW_STAGES = ["standardize_smiles", "match_corpus"]
+CATEGORY_RATIO = 0.5
 
 
 class DataCleaner:
-    def __init__(self, col_smiles, col_label):
+    def __init__(self, col_smiles, col_label, store=None,
+                 n_jobs=1, chunk_size=CHUNK_SIZE, cache=None, hooks=None,
+                 fast_filter=True, checkpoint=None, corpus=None,
+                 corpus_mode="flag", update_corpus=False, backend="molvs",
+                 lean=False, timeout=None):
         self.col_smiles = col_smiles
         self.col_label = col_label
+        self.fast_filter = fast_filter
+        self.backend = backend
+        self.lean = lean
+        self.timeout = timeout
+        if store is None:
+            store = MoleculeStore(keep=not lean)
+        self.store = store
+
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.hooks = list(hooks) if hooks is not None else []
+        self.checkpoint = checkpoint
+        self.corpus = corpus
+        self.corpus_mode = corpus_mode
+        self.update_corpus = update_corpus
+        self.errors = pd.DataFrame(columns=[col_smiles, "Error"])
+        self.quarantine = pd.DataFrame(columns=[col_smiles, "Seconds"])
 
     def clean(self, dataframe, task):
         """_summary_
@@ -22,13 +53,87 @@ class DataCleaner:
         Returns:
             _type_: _description_
         """
-        df = self.remove_nan(dataframe)
-        df = self.filter_atoms(df)
-        df = self.standardize_smiles(df)
-        df = self.remove_duplicates(df, task)
+        if self.checkpoint is not None:
+            self.checkpoint.begin(dataframe, (self.col_smiles,
+                                              self.col_label, self.backend,
+                                              self.lean))
+
+        df = dataframe
+        if self.lean:
+            df = self.run_stage("select_columns", self.select_columns, df,
+                                [self.col_smiles, self.col_label])
+        df = self.run_stage("remove_nan", self.remove_nan, df)
+        df = self.run_stage("filter_atoms", self.filter_atoms, df)
+        df = self.run_stage("standardize_smiles", self.standardize_smiles,
+                            df)
+        df = self.run_stage("remove_duplicates", self.remove_duplicates,
+                            df, task)
+        if self.corpus is not None:
+            df = self.run_stage("match_corpus", self.match_corpus, df)
+        if self.lean:
+            df = self.run_stage("materialize",
+                                functools.partial(self.materialize, dataframe),
+                                df)
+        self.store.retain(df.index)
+        if self.corpus is not None:
+            self.corpus.flush()
 
         return df
 
+    def run_stage(self, name, func, dataframe, *args):
+        """Run a stage through self.hooks (see profiling.run_stage)
+
+        With self.checkpoint, the stage output is loaded when saved by an
+        earlier run. Standardization is checkpointed per row instead, and
+        corpus matches depend on the corpus, so they always run.
+        """
+        if self.checkpoint is not None and name not in ROW_STAGES:
+            func = functools.partial(self.checkpoint.run, name, func)
+
+        return run_stage(self.hooks, name, func, dataframe, *args)
+
+    def select_columns(self, dataframe, columns):
+        """Keep the complete rows and the columns the stages use (lean)
+
+        In lean mode the following stages only copy these columns and
+        materialize takes the others from the input once at the end;
+        parsed molecules are not kept between stages either. Rows with NaN
+        in any column are dropped here as remove_nan would: the stages
+        before standardization are all row filters, so the result is the
+        same. Object columns other than Smiles and label are compacted
+        (see _compact).
+
+        Args:
+            dataframe (pd.DataFrame): Input dataframe
+            columns (list): Columns used by the stages
+
+        Returns:
+            pd.DataFrame: Complete rows of the used columns
+        """
+        if not dataframe.index.is_unique:
+            raise ValueError("lean mode needs a unique row index")
+
+        complete = dataframe.notna().all(axis=1).to_numpy()
+
+        return _compact(dataframe.loc[complete, columns],
+                        [self.col_smiles, self.col_label])
+
+    def materialize(self, dataframe, df):
+        """Full input rows for the rows and values of a lean run
+
+        Args:
+            dataframe (pd.DataFrame): Input dataframe
+            df (pd.DataFrame): Output of the lean stages
+
+        Returns:
+            pd.DataFrame: Output with all input columns, compacted
+        """
+        output = dataframe.take(dataframe.index.get_indexer(df.index))
+        for column in df.columns:
+            output[column] = df[column].values
+
+        return _compact(output, [self.col_smiles, self.col_label])
+
     def remove_nan(self, dataframe):
         """_summary_
 
@@ -43,19 +148,25 @@ class DataCleaner:
         return data
 
     def filter_atoms(self, dataframe):
-        """_summary_
+        """Keep molecules with two or more atoms, all in VALID_ATOMS
+
+        With fast_filter, Smiles rejected by ATOM_FILTER.prefilter are
+        never parsed; only the remaining rows are fully parsed.
 
         Args:
-            dataframe (_type_): _description_
+            dataframe (pd.DataFrame): Dataframe
 
         Returns:
-            _type_: _description_
+            pd.DataFrame: Dataframe with valid molecules
         """
+        if self.fast_filter:
+            return self._filter_atoms_fast(dataframe)
+
         valid_molecule = []
         smiles_all = dataframe[self.col_smiles]
 
-        for smiles in smiles_all.values:
-            mol = Chem.MolFromSmiles(str(smiles))
+        for key, smiles in smiles_all.items():
+            mol = self.store.get(key, str(smiles))
 
             if mol is not None:
                 molecule = []
@@ -79,107 +190,267 @@ class DataCleaner:
 
             else:
                 valid_molecule.append(False)
-        dataframe = dataframe[valid_molecule]
+        dataframe = dataframe[np.array(valid_molecule, dtype=bool)]
+        self.store.retain(dataframe.index)
+
+        return dataframe
+
+    def _filter_atoms_fast(self, dataframe):
+        valid_molecule = []
+        smiles_all = dataframe[self.col_smiles]
+
+        for key, smiles in smiles_all.items():
+            smiles = str(smiles)
+            valid = ATOM_FILTER.prefilter(smiles)
+
+            if valid:
+                valid = ATOM_FILTER.is_valid(self.store.get(key, smiles))
+
+            valid_molecule.append(valid)
+
+        dataframe = dataframe[np.array(valid_molecule, dtype=bool)]
+        self.store.retain(dataframe.index)
+
         return dataframe
 
     def standardize_smiles(self, dataframe):
-        """_summary_
+        """Replace Smiles by the standardized fragment parent
+
+        Rows saved in self.checkpoint and Smiles found in self.cache are
+        not standardized again; the others run with the backend
+        standardizer on n_jobs worker processes in chunks of chunk_size.
+        Rows that fail are dropped and reported in self.errors. With a
+        timeout, rows whose molecule takes longer than timeout seconds
+        are dropped and reported in self.quarantine with the time spent.
 
         Args:
-            dataframe (_type_): _description_
+            dataframe (pd.DataFrame): Dataframe
 
         Returns:
-            _type_: _description_
+            pd.DataFrame: Dataframe with standardized Smiles
         """
         smiles_all = dataframe[self.col_smiles]
-        cols_order = dataframe.columns
 
-        stdz = Standardizer()
+        smiles_in = [str(smiles) for smiles in smiles_all.values]
+        saved = {}
+        if self.checkpoint is not None:
+            saved = self.checkpoint.load_rows("standardize_smiles")
+
+        # Saved rows are reused only if their input Smiles is unchanged,
+        # saved timeouts only if the molecule would time out again
+        resumed = {idx: saved[key][1:]
+                   for idx, key in enumerate(smiles_all.index)
+                   if key in saved and saved[key][0] == smiles_in[idx]
+                   and not self._retry(saved[key][2])}
+
+        cached = {}
+        if self.cache is not None:
+            cached = self.cache.get_many([
+                smiles for idx, smiles in enumerate(smiles_in)
+                if idx not in resumed], self.backend)
+
+        todo = [idx for idx, smiles in enumerate(smiles_in)
+                if idx not in resumed and smiles not in cached]
+        if self.lean:
+            # Parsed by the workers, molecules are not kept
+            mols = [smiles_in[idx] for idx in todo]
+        else:
+            mols = [self.store.get(smiles_all.index[idx], smiles_in[idx])
+                    for idx in todo]
+        progress = functools.partial(report_progress, self.hooks,
+                                     "standardize_smiles")
+        results = dict(zip(todo, standardize_mols(mols, self.n_jobs,
+                                                  self.chunk_size,
+                                                  self.backend, progress,
+                                                  not self.lean,
+                                                  self.timeout)))
+
+        if self.cache is not None:
+            self.cache.put_many({smiles_in[idx]: result[0]
+                                 for idx, result in results.items()
+                                 if result[2] is None}, self.backend)
+
         smiles_stdz = []
+        valid_molecule = []
+        errors = {}
+        quarantine = {}
+
+        for idx, (key, smiles) in enumerate(smiles_all.items()):
+            if idx in results:
+                smi_stdz, mol_stdz, error = results[idx]
+            elif idx in resumed:
+                (smi_stdz, error), mol_stdz = resumed[idx], None
+            else:
+                smi_stdz, mol_stdz, error = cached[smiles_in[idx]], None, None
+
+            if isinstance(error, Timeout):
+                quarantine[key] = (smiles, error.seconds)
+            elif error is not None:
+                errors[key] = (smiles, error)
+            elif mol_stdz is not None:
+                smiles_stdz.append(smi_stdz)
+                self.store.put(key, smi_stdz, mol_stdz)
+            else:
+                smiles_stdz.append(smi_stdz)
+                self.store.discard(key)
 
-        for smiles in smiles_all.values:
-            mol = Chem.MolFromSmiles(str(smiles))
+            valid_molecule.append(error is None)
+            if self.checkpoint is not None and idx not in resumed:
+                saved[key] = (smiles_in[idx], smi_stdz, error)
 
-            mol_stdz = stdz.standardize(mol)
-            mol_stdz = stdz.fragment_parent(mol_stdz)
+        if self.checkpoint is not None and len(resumed) < len(smiles_in):
+            self.checkpoint.save_rows("standardize_smiles", saved)
 
-            smiles_stdz.append(Chem.MolToSmiles(mol_stdz))
+        self.errors = pd.DataFrame.from_dict(
+            errors, orient="index", columns=[self.col_smiles, "Error"])
+        self.quarantine = pd.DataFrame.from_dict(
+            quarantine, orient="index", columns=[self.col_smiles, "Seconds"])
 
-        assert len(smiles_all) == len(smiles_stdz)
+        df = dataframe[np.array(valid_molecule, dtype=bool)]
+        assert len(df) == len(smiles_stdz)
 
-        df = dataframe.drop(columns=[self.col_smiles])
-        df.insert(len(cols_order)-1, self.col_smiles, smiles_stdz)
-        df = df[cols_order]
+        # Replaced in place: the column keeps its position
+        df = df.assign(**{self.col_smiles: smiles_stdz})
+
+        if self.checkpoint is not None:
+            # Quarantined rows depend on the timeout, not only the input
+            self.checkpoint.link("standardize_smiles", dataframe, df,
+                                 sorted(quarantine))
 
         return df
 
-    def remove_duplicates(self, dataframe, task):
-        """_summary_
+    def _retry(self, error):
+        return isinstance(error, Timeout) and (self.timeout is None or
+                                               error.seconds < self.timeout)
+
+    def match_corpus(self, dataframe):
+        """Find rows whose standardized Smiles is in self.corpus
+
+        Known rows are flagged in the CORPUS_COLUMN column (corpus_mode
+        "flag") or removed ("drop"). With update_corpus, the Smiles not
+        yet in the corpus are added to it when the run ends.
 
         Args:
-            dataframe (_type_): _description_
-            task (_type_): _description_
+            dataframe (pd.DataFrame): Dataframe with standardized Smiles
 
         Returns:
-            _type_: _description_
+            pd.DataFrame: Flagged or filtered dataframe
         """
-        unique_smiles = dataframe[self.col_smiles].unique()
-        df = pd.DataFrame()
+        smiles = dataframe[self.col_smiles]
+        known = self.corpus.contains(smiles)
 
-        for uni_smiles in unique_smiles:
-            selection = dataframe[dataframe[self.col_smiles] == uni_smiles]
+        if self.update_corpus:
+            self.corpus.add(smiles[~known])
 
-            if len(selection) == 1:
-                df = pd.concat([df, selection], axis=0)
+        if self.corpus_mode == "drop":
+            return dataframe[~known]
 
-            else:
-                if task == "Classification":
-                    selection = _remove_classification(selection,
-                                                       self.col_smiles,
-                                                       self.col_label)
-                else:
-                    selection = _remove_regression(selection,
-                                                   self.col_smiles,
-                                                   self.col_label)
+        return dataframe.assign(**{CORPUS_COLUMN: known})
 
-                df = pd.concat([df, selection], axis=0)
+    def remove_duplicates(self, dataframe, task):
+        """Remove duplicated Smiles in a single grouped pass
 
-        return df
+        Rows are grouped by Smiles and the first row of each group is kept,
+        in order of first appearance. Groups with conflicting labels are
+        dropped (Classification) or get the mean label (Regression).
 
+        Args:
+            dataframe (pd.DataFrame): Dataframe
+            task (str): "Classification" or "Regression"
+
+        Returns:
+            pd.DataFrame: Dataframe without duplicated Smiles
+        """
+        if task == "Classification":
+            df = _remove_classification(dataframe,
+                                        self.col_smiles,
+                                        self.col_label)
+        else:
+            df = _remove_regression(dataframe,
+                                    self.col_smiles,
+                                    self.col_label)
+
+        return df
 
-def _remove_classification(selection, col_smiles, col_label):
-    unique_labels = selection[col_label].unique()
 
-    if len(unique_labels) == 1:
-        dataframe = selection.drop_duplicates(subset=[col_smiles])
+def _compact(dataframe, exclude):
+    """Make object columns with few distinct values categorical"""
+    for column in dataframe.columns:
+        values = dataframe[column]
+        if column in exclude or values.dtype != object:
+            continue
 
-    else:
-        dataframe = pd.DataFrame()
+        if values.nunique(dropna=False) <= CATEGORY_RATIO * len(values):
+            dataframe[column] = values.astype("category")
 
     return dataframe
 
 
-def _remove_regression(selection, col_smiles, col_label):
-    unique_labels = selection[col_label].unique()
+def _group_codes(smiles):
+    """Integer group code per row, numbered by first appearance (NaN = -1)"""
+    codes, _ = pd.factorize(smiles, sort=False)
 
-    if len(unique_labels) == 1:
-        dataframe = selection.drop_duplicates(subset=[col_smiles])
+    return codes
 
-    else:
-        mean_average = selection[col_label].mean()
-        dataframe = selection.drop_duplicates(subset=[col_smiles])
-        dataframe[col_label] = mean_average
 
-    return dataframe
+def _first_rows(codes):
+    """Mask selecting the first row of each group"""
+    return (~pd.Series(codes).duplicated()).to_numpy() & (codes >= 0)
+
+
+def _remove_classification(dataframe, col_smiles, col_label):
+    codes = _group_codes(dataframe[col_smiles])
+    labels = dataframe[col_label].groupby(codes)
+    n_labels = labels.transform("nunique", dropna=False)
+    mask = _first_rows(codes) & (n_labels.to_numpy() == 1)
+
+    return dataframe[mask]
+
+
+def _remove_regression(dataframe, col_smiles, col_label):
+    codes = _group_codes(dataframe[col_smiles])
+    labels = dataframe[col_label].groupby(codes)
+    conflict = labels.transform("nunique", dropna=False).to_numpy() > 1
+    mask = _first_rows(codes)
+
+    df = dataframe[mask]
+    conflict = conflict[mask]
+
+    if conflict.any():
+        mean_average = labels.transform("mean").to_numpy()[mask]
+        df = df.assign(**{col_label: df[col_label].where(~conflict,
+                                                         mean_average)})
+
+    return df
 
 
 class BioCleaner:
-    def __init__(self, col_smiles, col_strain, col_conv):
+    def __init__(self, col_smiles, col_strain, col_conv,
+                 n_jobs=1, chunk_size=CHUNK_SIZE, cache=None, hooks=None,
+                 checkpoint=None, corpus=None, corpus_mode="flag",
+                 update_corpus=False, cheap_first=True, backend="molvs",
+                 lean=False, timeout=None):
         self.col_smiles = col_smiles
         self.col_strain = col_strain
+        self.cheap_first = cheap_first
+        self.backend = backend
+        self.lean = lean
+        self.timeout = timeout
         self.col_conv = col_conv
 
         self.col_standard = col_conv[0]
+        self.store = MoleculeStore(keep=not lean)
+
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.hooks = list(hooks) if hooks is not None else []
+        self.checkpoint = checkpoint
+        self.corpus = corpus
+        self.corpus_mode = corpus_mode
+        self.update_corpus = update_corpus
+        self.errors = pd.DataFrame(columns=[col_smiles, "Error"])
+        self.quarantine = pd.DataFrame(columns=[col_smiles, "Seconds"])
 
     def bio_clean(self, dataframe, strains, threshold):
         """_summary_
@@ -195,18 +466,92 @@ class BioCleaner:
 
         """
 
-        dclean = DataCleaner(self.col_smiles, self.col_standard)
-
-        df = self.select_strains(dataframe, strains)
-        df = dclean.remove_nan(df)
-        df = dclean.filter_atoms(df)
-        df = self.convert_units(df, threshold)
-        # df = self.remove_outlier(df)
-        df = dclean.standardize_smiles(df)
-        df = self.remove_bioduplicates(df)
+        dclean = self.data_cleaner()
+        if self.checkpoint is not None:
+            self.checkpoint.begin(dataframe, (self.col_smiles,
+                                              self.col_strain,
+                                              tuple(self.col_conv),
+                                              self.backend, self.lean))
+
+        df = dataframe
+        for name, func, args in self.plan(dclean, strains, threshold):
+            df = dclean.run_stage(name, func, df, *args)
+        self.errors = dclean.errors
+        self.quarantine = dclean.quarantine
+
+        if self.lean:
+            df = dclean.run_stage("materialize",
+                                  functools.partial(dclean.materialize,
+                                                    dataframe), df)
+        self.store.retain(df.index)
+        if self.corpus is not None:
+            self.corpus.flush()
 
         return df
 
+    def data_cleaner(self):
+        """DataCleaner running the stages shared with DataCleaner.clean
+
+        Returns:
+            DataCleaner: Cleaner with the options and store of this one
+        """
+        return DataCleaner(self.col_smiles, self.col_standard,
+                           store=self.store, n_jobs=self.n_jobs,
+                           chunk_size=self.chunk_size, cache=self.cache,
+                           hooks=self.hooks, checkpoint=self.checkpoint,
+                           corpus=self.corpus, corpus_mode=self.corpus_mode,
+                           update_corpus=self.update_corpus,
+                           backend=self.backend, lean=self.lean,
+                           timeout=self.timeout)
+
+    def plan(self, dclean, strains, threshold):
+        """Stages of bio_clean, in running order
+
+        With cheap_first, the column filters (strains, NaN, units) run
+        before any RDKit work: filter_units drops the units convert_units
+        cannot convert, so atoms are only checked on convertible rows.
+        Every stage before standardization is a row filter, so the output
+        is the same as in the unplanned order. In lean mode,
+        DataCleaner.select_columns runs first.
+
+        Only convert_units depends on the threshold, so with a checkpoint
+        a new threshold reuses the filters before it. The inconclusive
+        ">" relations it drops still go through filter_atoms.
+
+        Args:
+            dclean (DataCleaner): Cleaner running the shared stages
+            strains (list): Strains to keep
+            threshold (float): Activity threshold (nM)
+
+        Returns:
+            list: (name, func, args) per stage
+        """
+        stages = []
+        if self.lean:
+            columns = [self.col_smiles, self.col_strain] + list(self.col_conv)
+            stages.append(("select_columns", dclean.select_columns,
+                           (columns,)))
+
+        stages += [("select_strains", self.select_strains, (strains,)),
+                   ("remove_nan", dclean.remove_nan, ())]
+
+        if self.cheap_first:
+            stages += [("filter_units", self.filter_units, ()),
+                       ("filter_atoms", dclean.filter_atoms, ()),
+                       ("convert_units", self.convert_units, (threshold,))]
+        else:
+            stages += [("filter_atoms", dclean.filter_atoms, ()),
+                       ("convert_units", self.convert_units, (threshold,))]
+
+        # ("remove_outlier", self.remove_outlier, ())
+        stages += [("standardize_smiles", dclean.standardize_smiles, ()),
+                   ("remove_bioduplicates", self.remove_bioduplicates, ())]
+
+        if self.corpus is not None:
+            stages.append(("match_corpus", dclean.match_corpus, ()))
+
+        return stages
+
     def select_strains(self, dataframe, strains):
         """_summary_
 
@@ -221,62 +566,82 @@ class BioCleaner:
 
         return df
 
+    def filter_units(self, dataframe):
+        """Drop the units convert_units cannot convert, without converting
+
+        Units outside VALID_UNITS are removed. The inconclusive ">"
+        relations depend on the threshold and are left to convert_units,
+        so this stage can be reused for any threshold.
+
+        Args:
+            dataframe (pd.DataFrame): Dataframe
+
+        Returns:
+            pd.DataFrame: Dataframe with convertible units
+        """
+        unit_codes, unit_names = _factorize(dataframe[self.col_conv[3]])
+        valid_unit = np.isin(unit_names, VALID_UNITS)[unit_codes]
+
+        return dataframe[valid_unit]
+
     def convert_units(self, dataframe, threshold):
-        """Convert Standard Value to nM
+        """Convert Standard Value to nM and label the activity
+
+        Rows with units outside VALID_UNITS and inconclusive ">" relations
+        bellow the threshold are removed. All steps are whole-column.
 
         Args:
-            dataframe (_type_): _description_
-            threshold (_type_): _description_
+            dataframe (pd.DataFrame): Dataframe
+            threshold (float): Activity threshold (nM)
 
         Returns:
-            _type_: _description_
+            pd.DataFrame: Dataframe with converted value and activity columns
         """
         mol_weight = self.col_conv[0]
         standard_relation = self.col_conv[1]
         standard_value = self.col_conv[2]
         standard_units = self.col_conv[3]
 
-        dataframe = dataframe[dataframe[standard_units].isin(VALID_UNITS)]
-        list_weight = list(dataframe[mol_weight])
-        list_relations = list(dataframe[standard_relation])
-        list_values = list(dataframe[standard_value])
-        list_units = list(dataframe[standard_units])
-
-        converted_values = []
-        for idx, unit in enumerate(list_units):
-            if unit == "ug.mL-1":
-                val = (list_values[idx] / float(list_weight[idx])) * 1000
-            elif unit == "uM":
-                val = list_values[idx] * 1000
-            elif unit == "nM":
-                val = list_values[idx]
-
-            converted_values.append(val)
-
-        # Create activity lists
-        converted_units = ["nM"] * len(list_values)
-        converted_activity = ["Inactive"] * len(list_values)
-        converted_activity_bin = [0] * len(list_values)
-
-        # Check activity
-        for idx, value in enumerate(converted_values):
-            # Bellow threshold
-            if (">" not in list_relations[idx]) and (value < threshold):
-                converted_activity[idx] = "Active"
-                converted_activity_bin[idx] = 1
-
-        # Create activity column
-        last_col = len(dataframe.columns)
-        dataframe.insert(last_col, "Converted Value", converted_values)
-        dataframe.insert(last_col+1, "Converted Units", converted_units)
-        dataframe.insert(last_col+2, "Activity", converted_activity)
-        dataframe.insert(last_col+3, "Bin Activity", converted_activity_bin)
+        # Units and relations have few distinct values: compare those once
+        unit_codes, unit_names = _factorize(dataframe[standard_units])
+        rel_codes, rel_names = _factorize(dataframe[standard_relation])
+
+        valid_unit = np.isin(unit_names, VALID_UNITS)[unit_codes]
+        unit_codes = unit_codes[valid_unit]
+        is_micro = (unit_names == "uM")[unit_codes]
+        is_mass = (unit_names == "ug.mL-1")[unit_codes]
+
+        greater = np.array([">" in str(rel) for rel in rel_names],
+                           dtype=bool)[rel_codes[valid_unit]]
+        inconclusive = np.isin(rel_names, ["'>'", "'>='"])[
+            rel_codes[valid_unit]]
+
+        # Convert to nM
+        values = dataframe[standard_value].to_numpy()[valid_unit]
+        converted_values = np.where(is_micro, values * 1000, values)
+
+        if is_mass.any():
+            weights = dataframe[mol_weight].to_numpy()[valid_unit][is_mass]
+            converted_values = converted_values.astype(float)
+            converted_values[is_mass] = ((values[is_mass] /
+                                          weights.astype(float)) * 1000)
+
+        # Check activity: bellow threshold
+        below = converted_values < threshold
+        active = ~greater & below
 
         # Remove inconclusive ">" relations
-        dataframe = dataframe[~((dataframe[standard_relation] == "'>'") &
-                                (dataframe["Converted Value"] < threshold))]
-        dataframe = dataframe[~((dataframe[standard_relation] == "'>='") &
-                                (dataframe["Converted Value"] < threshold))]
+        keep = ~(inconclusive & below)
+        valid_unit[valid_unit] = keep
+
+        # Create activity columns (lean: 1 byte per Bin Activity flag)
+        bin_activity = active[keep].astype(np.int8 if self.lean else int)
+        dataframe = dataframe[valid_unit].assign(**{
+            "Converted Value": converted_values[keep],
+            "Converted Units": "nM",
+            "Activity": np.array(["Inactive", "Active"],
+                                 dtype=object)[bin_activity],
+            "Bin Activity": bin_activity})
 
         return dataframe
 
@@ -305,47 +670,52 @@ class BioCleaner:
         return df
 
     def remove_bioduplicates(self, dataframe):
-        """_summary_
+        """Remove duplicated Smiles in a single grouped pass
+
+        For each Smiles the first row is kept when all converted values
+        agree. Otherwise, if all rows share the same activity, the first row
+        with the highest converted value is kept; conflicting groups are
+        dropped. Groups are returned in order of first appearance.
 
         Args:
-            dataframe (_type_): _description_
+            dataframe (pd.DataFrame): Dataframe
 
         Returns:
-            _type_: _description_
+            pd.DataFrame: Dataframe without duplicated Smiles
         """
-        unique_smiles = dataframe[self.col_smiles].unique()
-        df = pd.DataFrame()
+        df = _remove_bio(dataframe, self.col_smiles, "Converted Value")
 
-        for uni_smiles in unique_smiles:
-            selection = dataframe[dataframe[self.col_smiles] == uni_smiles]
+        return df
 
-            if len(selection) == 1:
-                df = pd.concat([df, selection], axis=0)
 
-            else:
-                selection = _remove_bio(selection,
-                                        self.col_smiles,
-                                        "Converted Value")
+def _factorize(column):
+    """Integer codes and distinct values (NaN included) of a column"""
+    codes, uniques = pd.factorize(column)
 
-                df = pd.concat([df, selection], axis=0)
+    # NaN is coded -1, which indexes the trailing NaN
+    return codes, np.append(np.asarray(uniques, dtype=object), np.nan)
 
-        return df
 
+def _remove_bio(dataframe, col_smiles, col_value):
+    codes = _group_codes(dataframe[col_smiles])
+    values = dataframe[col_value]
+    groups = values.groupby(codes)
 
-def _remove_bio(selection, col_smiles, col_value):
-    df_sub = selection[col_value]
-    unique_labels = df_sub.unique()
+    n_values = groups.transform("nunique", dropna=False).to_numpy()
+    n_activity = dataframe["Activity"].groupby(codes).transform(
+        "nunique", dropna=False).to_numpy()
+    max_value = groups.transform("max").to_numpy()
 
-    if len(unique_labels) == 1:
-        dataframe = selection.drop_duplicates(subset=[col_smiles])
+    # Same value everywhere: keep first row of the group
+    keep_first = _first_rows(codes) & (n_values == 1)
 
-    else:
-        # Check biological activity
-        if len(selection["Activity"].unique()) == 1:
-            dataframe = selection[df_sub == df_sub.max()]
-            dataframe = dataframe.iloc[:1]
+    # Same activity: keep first row holding the maximum value
+    is_max = (n_values > 1) & (n_activity == 1) & (values.to_numpy() ==
+                                                   max_value)
+    keep_max = np.zeros(len(codes), dtype=bool)
+    keep_max[is_max] = _first_rows(codes[is_max])
 
-        else:
-            dataframe = pd.DataFrame()
+    mask = keep_first | keep_max
+    order = np.argsort(codes[mask], kind="stable")
 
-    return dataframe
+    return dataframe[mask].iloc[order]
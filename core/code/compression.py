@@ -0,0 +1,185 @@
+import bz2
+import contextlib
+import gzip
+import io
+import os
+import zipfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = {".gz": "gzip", ".bz2": "bz2", ".zst": "zstd", ".zip": "zip"}
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "bz2": ".bz2", "zstd": ".zst",
+                          "zip": ".zip"}
+COMPRESSION_MIME_TYPES = {"gzip": "application/gzip",
+                          "bz2": "application/x-bzip2",
+                          "zstd": "application/zstd",
+                          "zip": "application/zip"}
+
+
+def file_compression(name):
+    """Guess the compression from a file name
+
+    Args:
+        name (str): File name or path
+
+    Returns:
+        str: "gzip", "bz2", "zstd", "zip" or None
+    """
+    extension = os.path.splitext(str(name))[1].lower()
+
+    return COMPRESSIONS.get(extension)
+
+
+def strip_compression(name):
+    """File name without its compression extension
+
+    Args:
+        name (str): File name or path
+
+    Returns:
+        str: e.g. "data.csv" for "data.csv.gz"
+    """
+    root, extension = os.path.splitext(str(name))
+
+    return root if extension.lower() in COMPRESSIONS else str(name)
+
+
+def open_input(source, compression):
+    """Open a compressed file as a decompressing binary stream
+
+    Nothing is extracted to disk. Zip archives must hold one table; its
+    member name is returned so the format can be taken from it.
+
+    Args:
+        source (str | file): Path or binary file object
+        compression (str): "gzip", "bz2", "zstd" or "zip"
+
+    Returns:
+        tuple: (binary file object, zip member name or None)
+    """
+    if compression == "gzip":
+        return gzip.open(source, "rb"), None
+
+    if compression == "bz2":
+        return bz2.open(source, "rb"), None
+
+    if compression == "zstd":
+        if isinstance(source, str):
+            source = open(source, "rb")
+        reader = _zstandard().ZstdDecompressor().stream_reader(source)
+
+        return io.BufferedReader(reader), None
+
+    with zipfile.ZipFile(source) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) != 1:
+            raise ValueError("zip archives must contain a single file, "
+                             f"found {len(members)}")
+
+        # The member keeps the archive file open after the archive closes
+        return archive.open(members[0]), members[0].filename
+
+
+@contextlib.contextmanager
+def open_output(path, encoding=None, newline=None):
+    """Open a file for writing, compressed as given by its extension
+
+    Args:
+        path (str): Output path, e.g. "data.csv.gz"
+        encoding (str, optional): Text encoding. Defaults to binary mode.
+        newline (str, optional): Newline mode of text files.
+
+    Yields:
+        file: Binary or text file object
+    """
+    with _open_binary(path) as file:
+        if encoding is None:
+            yield file
+            return
+
+        text = io.TextIOWrapper(file, encoding=encoding, newline=newline)
+        try:
+            yield text
+        finally:
+            text.flush()
+            text.detach()
+
+
+def compress(content, compression, member="data"):
+    """Compress file content in memory
+
+    Args:
+        content (bytes | str): File content (str is UTF-8 encoded)
+        compression (str): "gzip", "bz2", "zstd" or "zip"
+        member (str, optional): File name inside zip archives.
+
+    Returns:
+        bytes: Compressed content
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    if compression == "gzip":
+        return gzip.compress(content)
+
+    if compression == "bz2":
+        return bz2.compress(content)
+
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor().compress(content)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(member, content)
+
+    return buffer.getvalue()
+
+
+def available_compressions():
+    """Compressions usable in this environment
+
+    Returns:
+        list: Compression names
+    """
+    return [name for name in COMPRESSION_EXTENSIONS
+            if name != "zstd" or zstandard is not None]
+
+
+@contextlib.contextmanager
+def _open_binary(path):
+    compression = file_compression(path)
+
+    if compression == "gzip":
+        with gzip.open(path, "wb") as file:
+            yield file
+
+    elif compression == "bz2":
+        with bz2.open(path, "wb") as file:
+            yield file
+
+    elif compression == "zstd":
+        compressor = _zstandard().ZstdCompressor()
+        with open(path, "wb") as raw:
+            with compressor.stream_writer(raw, closefd=False) as file:
+                yield file
+
+    elif compression == "zip":
+        member = os.path.basename(strip_compression(path))
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            with archive.open(member, "w") as file:
+                yield file
+
+    else:
+        with open(path, "wb") as file:
+            yield file
+
+
+def _zstandard():
+    if zstandard is None:
+        raise ImportError("zstd files need the zstandard package "
+                          "(pip install zstandard)")
+
+    return zstandard
@@ -0,0 +1,162 @@
+import io
+import os
+
+import pandas as pd
+
+from core.code.compression import (file_compression, open_input,
+                                   open_output, strip_compression)
+from core.code.sdf_io import read_sdf, write_sdf
+
+FORMATS = {".csv": "csv", ".sdf": "sdf", ".parquet": "parquet",
+           ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+COLUMNAR = ["parquet", "arrow"]
+MIME_TYPES = {"csv": "text/csv",
+              "parquet": "application/vnd.apache.parquet",
+              "arrow": "application/vnd.apache.arrow.file"}
+EXTENSIONS = {"csv": ".csv", "sdf": ".sdf", "parquet": ".parquet",
+              "arrow": ".arrow"}
+
+
+def file_format(name):
+    """Guess the table format from a file name, e.g. "data.sdf.gz"
+
+    Args:
+        name (str): File name or path
+
+    Returns:
+        str: "csv", "sdf", "parquet" or "arrow" (defaults to "csv")
+    """
+    extension = os.path.splitext(strip_compression(name))[1].lower()
+
+    return FORMATS.get(extension, "csv")
+
+
+def read_table(source, fmt="csv", columns=None, n_jobs=1, compression=None):
+    """Load a CSV, SDF, Parquet or Arrow IPC file
+
+    Parquet, Arrow and SDF files only keep the given columns; CSV files
+    are read whole and then projected. Compressed files are decompressed
+    as a stream; the format of a zip archive is taken from its member.
+
+    Args:
+        source (str | file): Path or file object
+        fmt (str, optional): File format. Defaults to "csv".
+        columns (list, optional): Columns to load. Defaults to all.
+        n_jobs (int, optional): Worker processes to parse SDF records.
+        compression (str, optional): "gzip", "bz2", "zstd" or "zip".
+
+    Returns:
+        pd.DataFrame: File loaded as pd.DataFrame
+    """
+    if compression is None:
+        return _read_table(source, fmt, columns, n_jobs)
+
+    file, member = open_input(source, compression)
+    if member is not None:
+        fmt = file_format(member)
+
+    with file:
+        if fmt in COLUMNAR:
+            # Parquet and Arrow readers need random access
+            return _read_table(io.BytesIO(file.read()), fmt, columns, n_jobs)
+
+        return _read_table(file, fmt, columns, n_jobs)
+
+
+def _read_table(source, fmt, columns, n_jobs):
+    if fmt == "parquet":
+        return pd.read_parquet(source, columns=columns)
+
+    if fmt == "arrow":
+        return pd.read_feather(source, columns=columns)
+
+    if fmt == "csv":
+        data = pd.read_csv(source, delimiter=None)
+    else:
+        data = read_sdf(source, columns, n_jobs)
+
+    return data if columns is None else data[columns]
+
+
+def read_columns(source, fmt):
+    """Column names of a Parquet or Arrow file, read from its schema
+
+    Args:
+        source (str | file): Path or file object
+        fmt (str): "parquet" or "arrow"
+
+    Returns:
+        list: Column names
+    """
+    # pyarrow is only needed for Parquet and Arrow, as in pandas
+    if fmt == "parquet":
+        import pyarrow.parquet
+        schema = pyarrow.parquet.read_schema(source)
+    else:
+        import pyarrow.ipc
+        schema = pyarrow.ipc.open_file(source).schema
+
+    # Stored pandas indexes are not columns (RangeIndex is not stored)
+    metadata = schema.pandas_metadata or {}
+    index = [col for col in metadata.get("index_columns", [])
+             if isinstance(col, str)]
+
+    return [name for name in schema.names if name not in index]
+
+
+def table_bytes(dataframe, fmt="csv"):
+    """Serialize a DataFrame (without its index) as file content
+
+    Args:
+        dataframe (pd.DataFrame): Dataframe
+        fmt (str, optional): "csv", "parquet" or "arrow".
+
+    Returns:
+        bytes | str: File content (str for CSV)
+    """
+    if fmt == "csv":
+        return dataframe.to_csv(index=False, encoding="utf-8")
+
+    buffer = io.BytesIO()
+    _write_columnar(dataframe, buffer, fmt)
+
+    return buffer.getvalue()
+
+
+def write_table(dataframe, path, col_smiles=None, molecules=None, n_jobs=1):
+    """Write a DataFrame in the format given by the path extension
+
+    A compression extension (.gz, .bz2, .zst, .zip) compresses the output
+    while it is written.
+
+    Args:
+        dataframe (pd.DataFrame): Dataframe
+        path (str): Output path
+        col_smiles (str, optional): Smiles column, required for SDF.
+        molecules (list, optional): Molecules per row for SDF.
+        n_jobs (int, optional): Worker processes for large SDF outputs.
+    """
+    fmt = file_format(path)
+
+    if fmt in COLUMNAR:
+        if file_compression(path) is None:
+            _write_columnar(dataframe, path, fmt)
+        else:
+            with open_output(path) as file:
+                file.write(table_bytes(dataframe, fmt))
+
+    elif fmt == "csv":
+        with open_output(path, encoding="utf-8", newline="") as csv:
+            dataframe.to_csv(csv, index=False)
+
+    else:
+        with open_output(path, encoding="utf-8") as sdf:
+            write_sdf(dataframe, col_smiles, sdf, molecules, n_jobs)
+
+
+def _write_columnar(dataframe, target, fmt):
+    if fmt == "parquet":
+        dataframe.to_parquet(target, index=False)
+    else:
+        # Feather (Arrow IPC file) requires a default index
+        dataframe.reset_index(drop=True).to_feather(target)
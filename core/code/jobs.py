@@ -0,0 +1,166 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 2
+MAX_RESULTS = 4
+FINISHED = ["done", "failed", "cancelled"]
+
+
+class JobCancelled(Exception):
+    """Raised inside a job run when the job was cancelled"""
+
+
+class Job:
+    """Cleaning run executed in the background
+
+    A job is also a stage hook (see profiling.run_stage): the pipeline
+    reports its stages and standardization chunks to it, and a cancelled
+    job stops at the next stage or chunk by raising JobCancelled.
+    """
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.submitted = time.time()
+
+        self.status = "queued"
+        self.stage = None
+        self.stages = []
+        self.done_items = 0
+        self.total_items = 0
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+
+    def start(self, name, dataframe):
+        self._check()
+        self.stage = name
+        self.done_items, self.total_items = 0, len(dataframe)
+
+    def end(self, name, dataframe):
+        self.stages.append(name)
+
+    def progress(self, name, done, total):
+        self._check()
+        self.done_items, self.total_items = done, total
+
+    def cancel(self):
+        """Ask the job to stop (queued jobs never start)"""
+        self._cancel.set()
+
+    def done(self):
+        """Check if the job finished, failed or was cancelled
+
+        Returns:
+            bool: True if the job is over
+        """
+        return self.status in FINISHED
+
+    def fraction(self):
+        """Progress of the running stage
+
+        Returns:
+            float: Fraction between 0 and 1
+        """
+        if self.total_items == 0:
+            return 0.0
+
+        return min(self.done_items / self.total_items, 1.0)
+
+    def message(self):
+        """Status line of the job
+
+        Returns:
+            str: Current stage and progress
+        """
+        if self.status != "running" or self.stage is None:
+            return self.status.capitalize()
+
+        return (f"Stage {len(self.stages) + 1} ({self.stage}): "
+                f"{self.done_items}/{self.total_items}")
+
+    def _check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def _run(self, func, args):
+        if self._cancel.is_set():
+            self.status = "cancelled"
+            return
+
+        self.status = "running"
+        try:
+            self.result = func(*args, self)
+            self.status = "done"
+
+        except JobCancelled:
+            self.status = "cancelled"
+
+        except Exception as error:
+            self.error = f"{type(error).__name__}: {error}"
+            self.status = "failed"
+
+
+class JobManager:
+    """Bounded pool of background jobs shared by every session
+
+    At most max_workers jobs run at once; the others wait in the queue.
+    Jobs are identified by key: submitting a key again returns its queued,
+    running or finished job, unless it failed or was cancelled. Up to
+    max_results finished jobs are kept, so their results can be retrieved
+    after a page reload.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_results=MAX_RESULTS):
+        self.max_results = max_results
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="job")
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, name, func, *args):
+        """Run func(*args, job) in the background
+
+        Args:
+            key (tuple): Job identity, e.g. the page and run parameters
+            name (str): Display name, e.g. the input file name
+            func (callable): Job function; the job is passed as its last
+                argument, to be used as a stage hook
+
+        Returns:
+            Job: New or existing job
+        """
+        with self._lock:
+            for job in self.jobs.values():
+                if job.key == key and job.status not in ["failed",
+                                                         "cancelled"]:
+                    return job
+
+            job = Job(key, name)
+            self.jobs[job.id] = job
+            self._prune()
+
+        self.executor.submit(job._run, func, args)
+
+        return job
+
+    def get(self, job_id):
+        """Job with the given id
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            Job: Job, or None if unknown or pruned
+        """
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job.done()]
+
+        for job_id in finished[:max(0, len(finished) - self.max_results)]:
+            del self.jobs[job_id]
@@ -0,0 +1,84 @@
+from rdkit import Chem
+
+
+class MoleculeStore:
+    """Parsed RDKit molecules of a cleaning run, keyed by row
+
+    Each entry remembers the Smiles it was parsed from. Asking for a row
+    with a different Smiles (e.g. the standardized one) parses it again,
+    so a stale entry is never returned. With keep=False nothing is stored
+    and every access parses again, trading CPU time for memory.
+    """
+
+    def __init__(self, keep=True):
+        self.keep = keep
+        self.molecules = {}
+
+    def __len__(self):
+        return len(self.molecules)
+
+    def get(self, key, smiles):
+        """Return the molecule of a row, parsing it on first access
+
+        Args:
+            key (Hashable): Row key
+            smiles (str): Smiles of the row
+
+        Returns:
+            Chem.Mol: Parsed molecule (None if invalid)
+        """
+        entry = self.molecules.get(key)
+
+        if entry is not None and entry[0] == smiles:
+            return entry[1]
+
+        mol = Chem.MolFromSmiles(smiles)
+        if self.keep:
+            self.molecules[key] = (smiles, mol)
+
+        return mol
+
+    def put(self, key, smiles, mol):
+        """Store an already built molecule for a row
+
+        Args:
+            key (Hashable): Row key
+            smiles (str): Smiles matching the molecule
+            mol (Chem.Mol): Molecule
+        """
+        if self.keep:
+            self.molecules[key] = (smiles, mol)
+
+    def discard(self, key):
+        """Drop the molecule of a row, if stored
+
+        Args:
+            key (Hashable): Row key
+        """
+        self.molecules.pop(key, None)
+
+    def molecules_of(self, smiles_col):
+        """Return the molecules of a Smiles column, in row order
+
+        Args:
+            smiles_col (pd.Series): Smiles column
+
+        Returns:
+            list: Molecules
+        """
+        return [self.get(key, str(smiles))
+                for key, smiles in smiles_col.items()]
+
+    def retain(self, keys):
+        """Drop every molecule whose row is not in keys
+
+        Args:
+            keys (Iterable): Row keys still in use
+        """
+        keys = set(keys)
+        self.molecules = {key: entry for key, entry in self.molecules.items()
+                          if key in keys}
+
+    def clear(self):
+        """Drop all molecules"""
+        self.molecules = {}
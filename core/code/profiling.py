@@ -0,0 +1,170 @@
+import json
+import os
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+COLUMNS = ["Stage", "Calls", "Rows in", "Rows out", "Wall (s)", "CPU (s)",
+           "Memory delta (MB)", "Peak RSS (MB)"]
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def run_stage(hooks, name, func, dataframe, *args):
+    """Run one pipeline stage between the start/end calls of each hook
+
+    Args:
+        hooks (list): Objects with start(name, df) and end(name, df)
+        name (str): Stage name
+        func (callable): Stage, called as func(dataframe, *args)
+        dataframe (pd.DataFrame): Stage input
+
+    Returns:
+        pd.DataFrame: Stage output
+    """
+    for hook in hooks:
+        hook.start(name, dataframe)
+
+    df = func(dataframe, *args)
+
+    for hook in reversed(hooks):
+        hook.end(name, df)
+
+    return df
+
+
+def report_progress(hooks, name, done, total):
+    """Report the progress of a running stage
+
+    Only hooks with a progress(name, done, total) method are called.
+
+    Args:
+        hooks (list): Stage hooks
+        name (str): Stage name
+        done (int): Items processed so far
+        total (int): Items to process
+    """
+    for hook in hooks:
+        if hasattr(hook, "progress"):
+            hook.progress(name, done, total)
+
+
+class StageProfiler:
+    """Stage hook recording wall time, CPU time, rows and memory
+
+    CPU time includes finished child processes (standardization and SDF
+    workers). Memory delta is the change of the resident set size, so it
+    is only reported where /proc/self/statm exists. Peak RSS is the
+    highest resident set size of the process (or of a child process) so
+    far, so the stages that raise it show the peak of the run.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._running = {}
+
+    def start(self, name, dataframe):
+        self._running[name] = (len(dataframe), time.perf_counter(),
+                               _cpu_time(), _rss())
+
+    def end(self, name, dataframe):
+        rows_in, wall, cpu, rss = self._running.pop(name)
+        rss_end = _rss()
+        memory = None
+        if rss is not None and rss_end is not None:
+            memory = (rss_end - rss) / 2 ** 20
+
+        self.records.append({"stage": name,
+                             "rows_in": rows_in,
+                             "rows_out": len(dataframe),
+                             "wall_s": time.perf_counter() - wall,
+                             "cpu_s": _cpu_time() - cpu,
+                             "memory_delta_mb": memory,
+                             "peak_rss_mb": peak_rss_mb()})
+
+    def report(self):
+        """One row per stage; repeated stages (chunks) are summed
+
+        Returns:
+            pd.DataFrame: Stage report with COLUMNS
+        """
+        if not self.records:
+            return pd.DataFrame(columns=COLUMNS)
+
+        records = pd.DataFrame(self.records)
+        report = records.groupby("stage", sort=False).agg(
+            calls=("stage", "size"),
+            rows_in=("rows_in", "sum"),
+            rows_out=("rows_out", "sum"),
+            wall_s=("wall_s", "sum"),
+            cpu_s=("cpu_s", "sum"),
+            memory_delta_mb=("memory_delta_mb", _sum),
+            peak_rss_mb=("peak_rss_mb", "max")).reset_index()
+        report.columns = COLUMNS
+
+        return report
+
+    def to_json(self, path=None):
+        """Serialize the per-call records and the stage report
+
+        Args:
+            path (str, optional): Write to this file. Defaults to None.
+
+        Returns:
+            str: JSON document
+        """
+        report = self.report()
+        report = report.astype(object).where(report.notna(), None)
+        report = report.to_dict(orient="records")
+        text = json.dumps({"stages": report, "records": self.records},
+                          indent=2)
+
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text + "\n")
+
+        return text
+
+
+def _sum(values):
+    # Keep NaN when no delta was measured
+    return values.sum(min_count=1)
+
+
+def _cpu_time():
+    times = os.times()
+
+    return (times.user + times.system +
+            times.children_user + times.children_system)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and its children
+
+    Returns:
+        float: Peak RSS in MiB, None where resource is unavailable
+    """
+    if resource is None:
+        return None
+
+    # ru_maxrss is in KiB on Linux
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    return max(usage, children) / 1024
+
+
+def _rss():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
@@ -0,0 +1,243 @@
+import collections
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from rdkit import Chem
+
+from core.code.standardize import n_workers
+
+CHUNK_ROWS = 5000
+PARALLEL_ROWS = 20000
+READ_RECORDS = 10000
+
+
+def write_sdf(dataframe, col_smiles, buffer, molecules=None, n_jobs=1,
+              chunk_size=CHUNK_ROWS):
+    """Stream the rows of a DataFrame as SDF records into a text buffer
+
+    Records match PandasTools.WriteSDF(idName="RowID", properties=all
+    columns): the row key is the title and every column is a data field.
+    No DataFrame copy is made; molecules are parsed from the Smiles column
+    unless given. Molblocks of outputs with PARALLEL_ROWS rows or more are
+    built on n_jobs worker processes, chunk by chunk, in row order.
+
+    Args:
+        dataframe (pd.DataFrame): Dataframe
+        col_smiles (str): Smiles column
+        buffer (io.TextIOBase): Text buffer or file to write to
+        molecules (list, optional): Molecule per row. Defaults to None.
+        n_jobs (int, optional): Worker processes, < 1 uses all cores.
+        chunk_size (int, optional): Rows per chunk.
+
+    Returns:
+        io.TextIOBase: The buffer
+    """
+    n_jobs = n_workers(n_jobs)
+    chunks = _chunks(dataframe, col_smiles, molecules, chunk_size)
+
+    if n_jobs == 1 or len(dataframe) < PARALLEL_ROWS:
+        for chunk in chunks:
+            buffer.write(_sdf_chunk(chunk))
+
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            for text in executor.map(_sdf_chunk, map(_pickle_mols, chunks)):
+                buffer.write(text)
+
+    return buffer
+
+
+def sdf_bytes(dataframe, col_smiles, molecules=None, n_jobs=1):
+    """Return the rows of a DataFrame as SDF file content
+
+    Args:
+        dataframe (pd.DataFrame): Dataframe
+        col_smiles (str): Smiles column
+        molecules (list, optional): Molecule per row. Defaults to None.
+        n_jobs (int, optional): Worker processes for large outputs.
+
+    Returns:
+        bytes: SDF content
+    """
+    buffer = write_sdf(dataframe, col_smiles, io.StringIO(), molecules,
+                       n_jobs)
+
+    return buffer.getvalue().encode("utf-8")
+
+
+def _chunks(dataframe, col_smiles, molecules, chunk_size):
+    columns = list(dataframe.columns)
+    smiles = dataframe[col_smiles].tolist()
+    names = [str(key) for key in dataframe.index]
+
+    for begin in range(0, len(dataframe), chunk_size):
+        end = begin + chunk_size
+        yield {"number": begin + 1,
+               "names": names[begin:end],
+               "smiles": smiles[begin:end],
+               "props": columns,
+               "values": [dataframe[col].iloc[begin:end].tolist()
+                          for col in columns],
+               "mols": None if molecules is None else molecules[begin:end]}
+
+
+def _pickle_mols(chunk):
+    # Keep all properties: without them 2D layouts can differ in workers
+    if chunk["mols"] is not None:
+        chunk["mols"] = [mol.ToBinary(Chem.PropertyPickleOptions.AllProps)
+                         if mol is not None else None
+                         for mol in chunk["mols"]]
+
+    return chunk
+
+
+def _sdf_chunk(chunk):
+    mols = chunk["mols"]
+    if mols is None:
+        mols = [Chem.MolFromSmiles(str(smiles)) for smiles in chunk["smiles"]]
+
+    records = []
+    for row, (name, mol) in enumerate(zip(chunk["names"], mols)):
+        mol = Chem.Mol(mol) if mol is not None else Chem.Mol()
+        mol.SetProp("_Name", name)
+        records.append(Chem.MolToMolBlock(mol))
+
+        number = chunk["number"] + row
+        for prop, values in zip(chunk["props"], chunk["values"]):
+            records.append(f">  <{prop}>  ({number}) \n"
+                           f"{_format_value(values[row])}\n\n")
+        records.append("$$$$\n")
+
+    return "".join(records)
+
+
+def _format_value(value):
+    # Same formatting as PandasTools.WriteSDF: floats without E notation
+    if np.issubdtype(type(value), np.floating):
+        text = "{:f}".format(value).rstrip("0")
+        if text[-1] == ".":
+            text += "0"
+
+        return text
+
+    return str(value)
+
+
+def read_sdf(source, columns=None, n_jobs=1, chunk_size=READ_RECORDS):
+    """Load an SDF file as Smiles, ID and property columns
+
+    Same result as PandasTools.LoadSDF(smilesName="Smiles",
+    molColName=None), built from iter_sdf chunks.
+
+    Args:
+        source (str | file): Path or binary file object
+        columns (list, optional): Columns to keep. Defaults to all.
+        n_jobs (int, optional): Worker processes, < 1 uses all cores.
+        chunk_size (int, optional): Records per chunk.
+
+    Returns:
+        pd.DataFrame: One row per valid record, indexed by record number
+    """
+    chunks = [chunk for chunk in iter_sdf(source, columns, n_jobs, chunk_size)
+              if len(chunk) > 0]
+
+    if not chunks:
+        return pd.DataFrame()
+
+    return pd.concat(chunks)
+
+
+def iter_sdf(source, columns=None, n_jobs=1, chunk_size=READ_RECORDS):
+    """Stream an SDF file as DataFrames of chunk_size records
+
+    Records are split on "$$$$" lines and parsed (sanitized, without
+    explicit H) on n_jobs worker processes, a few chunks ahead of the
+    consumer. Only Smiles, ID (the record title) and the properties are
+    kept, so no molecule outlives its chunk. Invalid records are skipped
+    but still counted in the row index, like PandasTools.LoadSDF.
+
+    Args:
+        source (str | file): Path or binary file object
+        columns (list, optional): Columns to keep. Defaults to all.
+        n_jobs (int, optional): Worker processes, < 1 uses all cores.
+        chunk_size (int, optional): Records per chunk.
+
+    Yields:
+        pd.DataFrame: Chunk indexed by record number
+    """
+    n_jobs = n_workers(n_jobs)
+
+    if isinstance(source, str):
+        with open(source, "rb") as file:
+            yield from _read_chunks(file, columns, n_jobs, chunk_size)
+    else:
+        yield from _read_chunks(source, columns, n_jobs, chunk_size)
+
+
+def _read_chunks(file, columns, n_jobs, chunk_size):
+    tasks = ((number, data, columns)
+             for number, data in _split_records(file, chunk_size))
+
+    if n_jobs == 1:
+        yield from map(_read_records, tasks)
+        return
+
+    # Bounded look-ahead: only a few chunks are held at a time
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(executor.submit(_read_records, task))
+            if len(pending) > 2 * n_jobs:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _split_records(file, chunk_size):
+    number = 0
+    records = 0
+    lines = []
+
+    for line in file:
+        lines.append(line)
+        if line.startswith(b"$$$$"):
+            records += 1
+            if records == chunk_size:
+                yield number, b"".join(lines)
+                number += records
+                records = 0
+                lines = []
+
+    if lines:
+        yield number, b"".join(lines)
+
+
+def _read_records(task):
+    number, data, columns = task
+    supplier = Chem.ForwardSDMolSupplier(io.BytesIO(data), sanitize=True,
+                                         removeHs=True)
+    records = []
+    index = []
+
+    for idx, mol in enumerate(supplier, start=number):
+        if mol is None:
+            continue
+
+        row = {prop: mol.GetProp(prop) for prop in mol.GetPropNames()}
+        if mol.HasProp("_Name"):
+            row["ID"] = mol.GetProp("_Name")
+        try:
+            row["Smiles"] = Chem.MolToSmiles(mol)
+        except Exception:
+            row["Smiles"] = None
+
+        if columns is not None:
+            row = {col: row[col] for col in columns if col in row}
+
+        records.append(row)
+        index.append(idx)
+
+    return pd.DataFrame(records, index=index)
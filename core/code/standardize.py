@@ -0,0 +1,341 @@
+import collections
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import wait
+
+import pandas as pd
+from rdkit import Chem
+from rdkit.Chem.MolStandardize import rdMolStandardize
+from molvs import Standardizer
+
+CHUNK_SIZE = 1000
+BACKENDS = ["molvs", "rdkit"]
+WORKER_CRASHED = "Worker crashed"
+
+
+class Timeout:
+    """Error of a molecule stopped after exceeding the time limit
+
+    Attributes:
+        seconds (float): Time spent on the molecule before it was stopped
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __str__(self):
+        return f"Timeout after {self.seconds:.1f} s"
+
+    def __repr__(self):
+        return f"Timeout({self.seconds!r})"
+
+
+class RDKitStandardizer:
+    """MolVS Standardizer steps on the C++ rdMolStandardize classes
+
+    standardize removes explicit H, disconnects metals, normalizes,
+    reionizes and cleans up stereo like molvs.Standardizer.standardize.
+    fragment_parent keeps the largest fragment; unlike MolVS it does not
+    standardize again, its input being already standardized.
+    """
+
+    def __init__(self):
+        self.disconnector = rdMolStandardize.MetalDisconnector()
+        self.normalizer = rdMolStandardize.Normalizer()
+        self.reionizer = rdMolStandardize.Reionizer()
+        self.chooser = rdMolStandardize.LargestFragmentChooser()
+
+    def standardize(self, mol):
+        mol = Chem.RemoveHs(mol)
+        mol = self.disconnector.Disconnect(mol)
+        mol = self.normalizer.normalize(mol)
+        mol = self.reionizer.reionize(mol)
+        Chem.AssignStereochemistry(mol, force=True, cleanIt=True)
+
+        return mol
+
+    def fragment_parent(self, mol):
+        return self.chooser.choose(mol)
+
+
+def get_standardizer(backend="molvs"):
+    """Standardizer of a backend
+
+    Args:
+        backend (str, optional): "molvs" (reference) or "rdkit" (faster).
+
+    Returns:
+        Standardizer | RDKitStandardizer: Standardizer
+    """
+    if backend == "molvs":
+        return Standardizer()
+
+    if backend == "rdkit":
+        return RDKitStandardizer()
+
+    raise ValueError(f"unknown standardizer backend: {backend}")
+
+
+def standardize_mol(mol, stdz):
+    """Standardize a molecule and keep its fragment parent
+
+    Args:
+        mol (Chem.Mol | str): Molecule, or Smiles to parse
+        stdz (Standardizer | RDKitStandardizer): Backend standardizer
+
+    Returns:
+        tuple: (Smiles, Mol, None) on success, (None, None, error) otherwise
+    """
+    if isinstance(mol, str):
+        mol = Chem.MolFromSmiles(mol)
+
+    if mol is None:
+        return None, None, "Invalid Smiles"
+
+    try:
+        mol_stdz = stdz.standardize(mol)
+        mol_stdz = stdz.fragment_parent(mol_stdz)
+
+        return Chem.MolToSmiles(mol_stdz), mol_stdz, None
+
+    except Exception as error:
+        return None, None, f"{type(error).__name__}: {error}"
+
+
+def standardize_mols(mols, n_jobs=1, chunk_size=CHUNK_SIZE, backend="molvs",
+                     progress=None, keep_mols=True, timeout=None):
+    """Standardize molecules, optionally on a process pool
+
+    Molecules are split in chunks of chunk_size and results are returned in
+    input order. A failing molecule only yields an error for its own row.
+
+    With a timeout, molecules always run in separate worker processes
+    (n_jobs of them, at least one). A worker spending more than timeout
+    seconds on one molecule is killed and replaced; the molecule gets a
+    Timeout error and the rest of its chunk goes on in the new worker.
+    The clock starts once a worker is ready, not while it starts up.
+
+    Args:
+        mols (list): Molecules, or Smiles parsed by the workers
+        n_jobs (int, optional): Worker processes, < 1 uses all cores.
+        chunk_size (int, optional): Molecules sent to a worker at once.
+        backend (str, optional): Standardizer backend, see BACKENDS.
+        progress (callable, optional): Called as progress(done, total)
+            after each chunk (each molecule with a timeout); an exception
+            raised there stops the run.
+        keep_mols (bool, optional): Return the standardized molecules;
+            if False, Mol is None in every result.
+        timeout (float, optional): Time limit per molecule, in seconds.
+
+    Returns:
+        list: (Smiles, Mol, error) per molecule; error is a str, or a
+        Timeout for molecules stopped by the time limit
+    """
+    n_jobs = n_workers(n_jobs)
+    chunks = [mols[i:i + chunk_size] for i in range(0, len(mols), chunk_size)]
+
+    if timeout is not None:
+        if not chunks:
+            return []
+
+        return _standardize_watched(chunks, min(n_jobs, max(len(chunks), 1)),
+                                    backend, keep_mols, timeout, progress)
+    standardize_chunk = functools.partial(_standardize_chunk,
+                                          backend=backend,
+                                          keep_mols=keep_mols)
+
+    if n_jobs == 1 or len(chunks) <= 1:
+        results = _collect(map(standardize_chunk, chunks), len(mols),
+                           progress)
+
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks))) as ex:
+            try:
+                results = _collect(ex.map(standardize_chunk, chunks),
+                                   len(mols), progress)
+            except BaseException:
+                # Do not wait for the chunks not started yet
+                ex.shutdown(cancel_futures=True)
+                raise
+
+    return [result for chunk in results for result in chunk]
+
+
+def compare_backends(smiles, backends=BACKENDS, n_jobs=1,
+                     chunk_size=CHUNK_SIZE):
+    """Standardize Smiles with several backends and keep the differences
+
+    Args:
+        smiles (Iterable): Input Smiles (duplicates are compared once)
+        backends (list, optional): Backends to compare.
+        n_jobs (int, optional): Worker processes, < 1 uses all cores.
+        chunk_size (int, optional): Molecules sent to a worker at once.
+
+    Returns:
+        pd.DataFrame: Input Smiles and the result of each backend
+        (canonical Smiles or error), for the Smiles where they differ
+    """
+    smiles = pd.unique(pd.Series(list(smiles), dtype=object).astype(str))
+    mols = [Chem.MolFromSmiles(smi) for smi in smiles]
+
+    results = {"Smiles": smiles}
+    for backend in backends:
+        results[backend] = [
+            smi_stdz if error is None else f"error: {error}"
+            for smi_stdz, _, error in standardize_mols(mols, n_jobs,
+                                                       chunk_size, backend)]
+
+    df = pd.DataFrame(results)
+    differ = df[backends].nunique(axis=1) > 1
+
+    return df[differ.to_numpy()].reset_index(drop=True)
+
+
+def _collect(chunk_results, total, progress):
+    results = []
+    done = 0
+
+    for chunk in chunk_results:
+        results.append(chunk)
+        done += len(chunk)
+        if progress is not None:
+            progress(done, total)
+
+    return results
+
+
+def _standardize_chunk(mols, backend, keep_mols=True):
+    stdz = get_standardizer(backend)
+    results = [standardize_mol(mol, stdz) for mol in mols]
+
+    if not keep_mols:
+        results = [(smiles, None, error) for smiles, _, error in results]
+
+    return results
+
+
+def _standardize_watched(chunks, n_jobs, backend, keep_mols, timeout,
+                         progress):
+    results = [[None] * len(chunk) for chunk in chunks]
+    # (chunk, first position, molecules) not sent to a worker yet
+    pending = collections.deque((i, 0, chunk)
+                                for i, chunk in enumerate(chunks))
+    total = sum(map(len, chunks))
+    done = 0
+
+    # Connection -> [process, task, molecules done, start of the current one]
+    workers = {}
+    # Workers not ready yet: start-up does not count against a molecule
+    starting = set()
+
+    def spawn():
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_watched_worker,
+                                          args=(child_conn, backend,
+                                                keep_mols),
+                                          daemon=True)
+        process.start()
+        child_conn.close()
+        workers[conn] = [process, None, 0, None]
+        starting.add(conn)
+
+    def assign(conn):
+        worker = workers[conn]
+        worker[1], worker[2] = None, 0
+        if pending:
+            worker[1], worker[3] = pending.popleft(), time.monotonic()
+            conn.send(worker[1][2])
+
+    def replace(conn, error):
+        # Record the current molecule, requeue the rest of its task
+        process, (i, start, chunk), offset, _ = workers.pop(conn)
+        process.kill()
+        process.join()
+        conn.close()
+
+        results[i][start + offset] = (None, None, error)
+        if offset + 1 < len(chunk):
+            pending.appendleft((i, start + offset + 1, chunk[offset + 1:]))
+        if pending:
+            spawn()
+
+    try:
+        for _ in range(n_jobs):
+            spawn()
+
+        while done < total:
+            busy = {conn: worker for conn, worker in workers.items()
+                    if worker[1] is not None or conn in starting}
+            starts = [worker[3] for conn, worker in busy.items()
+                      if conn not in starting]
+            wait_time = None
+            if starts:
+                wait_time = max(min(starts) + timeout - time.monotonic(), 0)
+
+            for conn in wait(list(busy), wait_time):
+                worker = busy[conn]
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    if conn in starting:
+                        raise RuntimeError("standardization worker exited "
+                                           "on start-up")
+                    replace(conn, WORKER_CRASHED)
+                else:
+                    if conn in starting:
+                        # Ready message
+                        starting.discard(conn)
+                        assign(conn)
+                        continue
+
+                    i, start, chunk = worker[1]
+                    results[i][start + worker[2]] = result
+                    worker[2] += 1
+                    worker[3] = time.monotonic()
+                    if worker[2] == len(chunk):
+                        assign(conn)
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+
+            now = time.monotonic()
+            for conn, worker in busy.items():
+                if (conn in workers and worker[1] is not None
+                        and now - worker[3] > timeout):
+                    replace(conn, Timeout(now - worker[3]))
+                    done += 1
+                    if progress is not None:
+                        progress(done, total)
+
+    finally:
+        for conn, (process, _, _, _) in workers.items():
+            process.kill()
+            process.join()
+            conn.close()
+
+    return [result for chunk in results for result in chunk]
+
+
+def _watched_worker(conn, backend, keep_mols):
+    stdz = get_standardizer(backend)
+    conn.send(None)
+
+    while True:
+        try:
+            mols = conn.recv()
+        except EOFError:
+            return
+
+        for mol in mols:
+            smiles, mol_stdz, error = standardize_mol(mol, stdz)
+            conn.send((smiles, mol_stdz if keep_mols else None, error))
+
+
+def n_workers(n_jobs):
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+
+    return n_jobs
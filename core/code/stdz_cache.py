@@ -0,0 +1,132 @@
+import hashlib
+import sqlite3
+import time
+
+import molvs
+import rdkit
+
+MAX_ENTRIES = 1000000
+BATCH = 500
+
+
+class StandardizationCache:
+    """On-disk cache of standardized Smiles, stored in SQLite
+
+    Entries are keyed by a hash of the input Smiles and the standardizer
+    backend. The RDKit and MolVS versions are saved with the cache and any
+    change empties it. Beyond max_entries the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = f"rdkit={rdkit.__version__};molvs={molvs.__version__}"
+
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path, timeout=60,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta "
+                          "(name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS smiles "
+                          "(key BLOB PRIMARY KEY, smiles TEXT, used REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS smiles_used "
+                          "ON smiles (used)")
+        self._check_version()
+        self.entries = self.conn.execute(
+            "SELECT COUNT(*) FROM smiles").fetchone()[0]
+
+    def get_many(self, smiles_list, backend="molvs"):
+        """Look up standardized Smiles and mark them as recently used
+
+        Args:
+            smiles_list (list): Input Smiles
+            backend (str, optional): Standardizer backend.
+
+        Returns:
+            dict: Input Smiles -> standardized Smiles, for cached entries
+        """
+        keys = {_key(smiles, backend): smiles for smiles in set(smiles_list)}
+        found = {}
+
+        for batch in _batches(list(keys)):
+            rows = self.conn.execute(
+                "SELECT key, smiles FROM smiles WHERE key IN "
+                f"({','.join('?' * len(batch))})", batch).fetchall()
+            found.update((keys[key], smiles) for key, smiles in rows)
+
+            self.conn.executemany(
+                "UPDATE smiles SET used = ? WHERE key = ?",
+                [(time.time(), key) for key, _ in rows])
+        self.conn.commit()
+
+        self.hits += sum(smiles in found for smiles in smiles_list)
+        self.misses += sum(smiles not in found for smiles in smiles_list)
+
+        return found
+
+    def put_many(self, pairs, backend="molvs"):
+        """Store standardized Smiles, evicting the oldest entries if full
+
+        Args:
+            pairs (dict): Input Smiles -> standardized Smiles
+            backend (str, optional): Standardizer backend.
+        """
+        now = time.time()
+        rows = {_key(smiles, backend): smiles_stdz
+                for smiles, smiles_stdz in pairs.items()}
+
+        for batch in _batches(list(rows)):
+            cached = self.conn.execute(
+                "SELECT COUNT(*) FROM smiles WHERE key IN "
+                f"({','.join('?' * len(batch))})", batch).fetchone()[0]
+            self.entries += len(batch) - cached
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO smiles VALUES (?, ?, ?)",
+            [(key, smiles_stdz, now) for key, smiles_stdz in rows.items()])
+
+        excess = self.entries - self.max_entries
+        if excess > 0:
+            self.entries -= self.conn.execute(
+                "DELETE FROM smiles WHERE key IN (SELECT key FROM smiles "
+                "ORDER BY used LIMIT ?)", (excess,)).rowcount
+        self.conn.commit()
+
+    def stats(self):
+        """Return hit and miss counts of this session
+
+        Returns:
+            dict: Hits, misses and cached entries
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self)}
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.entries
+
+    def _check_version(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'version'"
+                                ).fetchone()
+
+        if row is None or row[0] != self.version:
+            self.conn.execute("DELETE FROM smiles")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES "
+                              "('version', ?)", (self.version,))
+            self.conn.commit()
+
+
+def _key(smiles, backend):
+    return hashlib.blake2b(f"{backend}\0{smiles}".encode("utf-8"),
+                           digest_size=16).digest()
+
+
+def _batches(items):
+    for i in range(0, len(items), BATCH):
+        yield items[i:i + BATCH]
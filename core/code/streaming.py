@@ -0,0 +1,210 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from core.code.compression import file_compression, open_input, open_output
+from core.code.file_io import file_format
+from core.code.sdf_io import iter_sdf
+
+CHUNK_ROWS = 100000
+
+
+class StreamCleaner:
+    """Run DataCleaner.clean over a CSV or SDF in fixed-size chunks
+
+    Each chunk goes through remove_nan, filter_atoms and standardize_smiles
+    and is spilled to a temporary CSV. For the dedup only a compact state
+    per Smiles hash is kept (first row, label min/max, sum and count); a
+    second pass over the spilled rows keeps the first row of each Smiles
+    and writes the output incrementally. Peak memory follows chunk_size
+    and the number of distinct Smiles, not the file size.
+    """
+
+    def __init__(self, dcleaner, chunk_size=CHUNK_ROWS):
+        self.dcleaner = dcleaner
+        self.chunk_size = chunk_size
+
+        self.rows_in = 0
+        self.rows_out = 0
+        self.errors = pd.DataFrame(columns=[dcleaner.col_smiles, "Error"])
+        self.quarantine = pd.DataFrame(columns=[dcleaner.col_smiles,
+                                                "Seconds"])
+
+    def clean(self, input_path, output_path, task):
+        """Clean a CSV or SDF file and write the result as CSV
+
+        Args:
+            input_path (str): Input CSV or SDF path
+            output_path (str): Output CSV path
+            task (str): "Classification" or "Regression"
+
+        Returns:
+            int: Number of rows written
+        """
+        regression = task != "Classification"
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spill_path = os.path.join(tmp_dir, "spill.csv")
+            columns, state = self._first_pass(input_path, spill_path,
+                                              regression)
+            self._second_pass(spill_path, output_path, columns, state,
+                              regression)
+        if self.dcleaner.corpus is not None:
+            self.dcleaner.corpus.flush()
+
+        return self.rows_out
+
+    def _first_pass(self, input_path, spill_path, regression):
+        dclean = self.dcleaner
+        columns = None
+        states = []
+        pending = 0
+        state = None
+        errors = []
+        quarantine = []
+
+        with open(spill_path, "w", newline="") as spill:
+            for chunk in self._read_chunks(input_path):
+                self.rows_in += len(chunk)
+                if columns is None:
+                    columns = list(chunk.columns)
+
+                df = dclean.run_stage("remove_nan", dclean.remove_nan, chunk)
+                df = dclean.run_stage("filter_atoms", dclean.filter_atoms, df)
+                df = dclean.run_stage("standardize_smiles",
+                                      dclean.standardize_smiles, df)
+                dclean.store.clear()
+                errors.append(dclean.errors)
+                quarantine.append(dclean.quarantine)
+
+                if len(df) == 0:
+                    continue
+
+                df.to_csv(spill, header=spill.tell() == 0,
+                          index_label="__row__")
+
+                states.append(_chunk_state(df, dclean.col_smiles,
+                                           dclean.col_label, regression))
+                pending += len(df)
+
+                # Merge pending chunk states once they outgrow the state
+                if pending > max(_size(state), self.chunk_size):
+                    state = _merge_states([state] + states, regression)
+                    states = []
+                    pending = 0
+
+        self.errors = pd.concat([self.errors] + errors)
+        self.quarantine = pd.concat([self.quarantine] + quarantine)
+        state = _merge_states([state] + states, regression)
+
+        return columns, state
+
+    def _second_pass(self, spill_path, output_path, columns, state,
+                     regression):
+        dclean = self.dcleaner
+
+        header = True
+
+        with open_output(output_path, encoding="utf-8",
+                         newline="") as output:
+            if state is None:
+                pd.DataFrame(columns=columns).to_csv(output, index=False)
+                return
+
+            conflict = (state["low"] != state["high"]).to_numpy()
+            if regression:
+                mean_average = (state["total"] / state["count"]).to_numpy()
+
+            for df in pd.read_csv(spill_path, index_col="__row__",
+                                  chunksize=self.chunk_size):
+                pos = state.index.searchsorted(_hash(df[dclean.col_smiles]))
+                keep = state["row"].to_numpy()[pos] == df.index.to_numpy()
+
+                if not regression:
+                    keep &= ~conflict[pos]
+                elif conflict.any():
+                    label = df[dclean.col_label].astype(float).where(
+                        ~conflict[pos], mean_average[pos])
+                    df = df.assign(**{dclean.col_label: label})
+
+                df = df[keep]
+                if dclean.corpus is not None:
+                    df = dclean.run_stage("match_corpus", dclean.match_corpus,
+                                          df)
+
+                df.to_csv(output, header=header, index=False)
+                header = False
+                self.rows_out += len(df)
+
+    def _read_chunks(self, path):
+        file, fmt = _open_input(path)
+
+        with file:
+            if fmt == "sdf":
+                yield from _uniform_chunks(iter_sdf(
+                    file, n_jobs=self.dcleaner.n_jobs,
+                    chunk_size=self.chunk_size))
+                return
+
+            # Comma separated, as read_table reads CSV
+            yield from pd.read_csv(file, chunksize=self.chunk_size)
+
+
+def _open_input(path):
+    """Binary (decompressing) stream and table format of an input file"""
+    compression = file_compression(path)
+    if compression is None:
+        return open(path, "rb"), file_format(path)
+
+    file, member = open_input(path, compression)
+
+    return file, file_format(member if member is not None else path)
+
+
+def _uniform_chunks(chunks):
+    """Give every SDF chunk the columns of the first non-empty one"""
+    columns = None
+
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+
+        if columns is None:
+            columns = list(chunk.columns)
+        elif not set(chunk.columns) <= set(columns):
+            # Earlier rows would miss these fields (NaN rows in clean)
+            raise ValueError("SDF records do not share the same fields, "
+                             "load the file without streaming")
+
+        yield chunk.reindex(columns=columns)
+
+
+def _hash(smiles):
+    return pd.util.hash_pandas_object(smiles, index=False).to_numpy()
+
+
+def _size(state):
+    return 0 if state is None else len(state)
+
+
+def _chunk_state(dataframe, col_smiles, col_label, regression):
+    labels = dataframe[col_label].to_numpy()
+    state = {"row": dataframe.index.to_numpy(), "low": labels,
+             "high": labels}
+    if regression:
+        state.update(total=labels.astype(float), count=1)
+
+    return pd.DataFrame(state, index=_hash(dataframe[col_smiles]))
+
+
+def _merge_states(states, regression):
+    agg = {"row": "min", "low": "min", "high": "max"}
+    if regression:
+        agg.update(total="sum", count="sum")
+    states = [state for state in states if state is not None]
+
+    if len(states) == 0:
+        return None
+
+    return pd.concat(states).groupby(level=0, sort=True).agg(agg)
@@ -1,49 +1,253 @@
+import hashlib
+import io
+import os
+import time
+
 import pandas as pd
 import streamlit as st
-from rdkit.Chem.PandasTools import LoadSDF
+
+from core.code.compression import (COMPRESSION_EXTENSIONS,
+                                   COMPRESSION_MIME_TYPES,
+                                   available_compressions, compress,
+                                   file_compression)
+from core.code.jobs import MAX_WORKERS, JobManager
+from core.code.structure_index import CORPUS_MODES, StructureIndex
+from core.code.file_io import (COLUMNAR, EXTENSIONS, MIME_TYPES,
+                               file_format, read_columns, read_table,
+                               table_bytes)
+from core.code.checkpoint import PipelineCheckpoint
+from core.code.sdf_io import sdf_bytes
+from core.code.stdz_cache import StandardizationCache
 
 DELIMITERS = {",": ",", ";": ";"}
+UPLOAD_TYPES = ["csv", "sdf", "parquet", "pq", "arrow", "feather",
+                "gz", "bz2", "zst", "zip"]
+DOWNLOAD_FORMATS = {"CSV": "csv", "Parquet": "parquet", "Arrow": "arrow"}
+MAX_UPLOADS = 4
+MAX_FRAMES = 16
+PREVIEW_ROWS = 100
+JOB_WORKERS = int(os.environ.get("MOLDATAPROC_JOB_WORKERS", MAX_WORKERS))
+# Worker processes of one job or upload: the running jobs share the cores
+JOB_PROCESSES = int(os.environ.get("MOLDATAPROC_JOB_PROCESSES",
+                                   max(1, (os.cpu_count() or 1) //
+                                       JOB_WORKERS)))
+SDF_JOBS = JOB_PROCESSES
+MAX_JOBS = 8
+STDZ_CACHE = os.environ.get("MOLDATAPROC_STDZ_CACHE")
+STDZ_BACKEND = os.environ.get("MOLDATAPROC_STDZ_BACKEND", "molvs")
+# Seconds per molecule, unset for no limit
+STDZ_TIMEOUT = float(os.environ.get("MOLDATAPROC_STDZ_TIMEOUT", 0)) or None
+CHECKPOINTS = os.environ.get("MOLDATAPROC_CHECKPOINTS")
+CORPUS = os.environ.get("MOLDATAPROC_CORPUS")
 
 
 class Misc:
-    def load_csv_sdf(uploaded_file):
-        """Load a CSV or SDF file
+    def file_key(uploaded_file):
+        """Content hash of an uploaded file
 
         Args:
             uploaded_file (_type_): Uploaded file
 
+        Returns:
+            str: MD5 hex digest of the file content
+        """
+        return hashlib.md5(uploaded_file.getvalue()).hexdigest()
+
+    def load_csv_sdf(uploaded_file, columns=None):
+        """Load a CSV, SDF, Parquet or Arrow file, parsed once per content
+
+        Files compressed with gzip, bz2, zstd or zip are decompressed as
+        a stream while they are parsed. Parquet and Arrow files only read
+        the given columns; other files are parsed whole (and cached) and
+        the columns are taken from that frame.
+
+        Args:
+            uploaded_file (_type_): Uploaded file
+            columns (list, optional): Columns to load. Defaults to all.
+
         Returns:
             DataFrame: File loaded as pd.DataFrame
         """
-        if uploaded_file.type == "text/csv":
-            file = pd.read_csv(uploaded_file, delimiter=None)
+        fmt = file_format(uploaded_file.name)
+        compression = file_compression(uploaded_file.name)
+        if columns is not None and fmt not in COLUMNAR:
+            # Not a new cache entry per column selection
+            return Misc.load_csv_sdf(uploaded_file)[list(columns)]
+        if columns is not None:
+            columns = tuple(columns)
 
-        else:
-            file = LoadSDF(uploaded_file, smilesName="Smiles", molColName=None)
+        file = _read_upload(Misc.file_key(uploaded_file), fmt, compression,
+                            columns, uploaded_file.getvalue())
 
         return file
 
-    def download_data(data, file_name: str, disp_text: str, sidebar=False):
-        """Donload pd.DataFrame as CSV file
+    def file_columns(uploaded_file):
+        """Column names of an uploaded file
+
+        Uncompressed Parquet and Arrow files only read the schema; other
+        files are loaded (and cached) whole.
+
+        Args:
+            uploaded_file (_type_): Uploaded file
+
+        Returns:
+            list: Column names
+        """
+        fmt = file_format(uploaded_file.name)
+        compressed = file_compression(uploaded_file.name) is not None
+        if fmt not in COLUMNAR or compressed:
+            return list(Misc.load_csv_sdf(uploaded_file).columns)
+
+        return _read_columns(Misc.file_key(uploaded_file), fmt,
+                             uploaded_file.getvalue())
+
+    def download_data(data, data_key, file_name: str, disp_text: str,
+                      sidebar=False, fmt="csv", compression=None):
+        """Donload pd.DataFrame as CSV, Parquet or Arrow file
+
+        The file content is cached on data_key, the frame is not hashed.
 
         Args:
             dataframe (pd.DataFrame): Dataframe to be downloaded
+            data_key (tuple): Stable id of the frame, e.g. the job id
             file_name (str): File name
             disp_text (str): Button label
             sidebar (bool, optional): Enable sidebar. Defaults to False.
+            fmt (str, optional): "csv", "parquet" or "arrow".
+            compression (str, optional): Compress the file. Defaults to None.
+        """
+        Misc.download_bytes(_to_bytes(data_key, fmt, data),
+                            f"{file_name}{EXTENSIONS[fmt]}", disp_text,
+                            sidebar, MIME_TYPES[fmt], compression)
+
+    def download_bytes(content, file_name: str, disp_text: str,
+                       sidebar=False, mime=None, compression=None):
+        """Download file content, optionally compressed
+
+        Args:
+            content (bytes | str): File content
+            file_name (str): File name, with extension
+            disp_text (str): Button label
+            sidebar (bool, optional): Enable sidebar. Defaults to False.
+            mime (str, optional): MIME type of the uncompressed file.
+            compression (str, optional): "gzip", "bz2", "zstd" or "zip".
         """
-        csv = data.to_csv(index=False, encoding="utf-8")
+        if compression is not None:
+            content = _compress(content, compression, file_name)
+            file_name = f"{file_name}{COMPRESSION_EXTENSIONS[compression]}"
+            mime = COMPRESSION_MIME_TYPES[compression]
 
         if sidebar:
             st.sidebar.download_button(label=disp_text,
-                                       data=csv,
-                                       file_name=f"{file_name}.csv",
-                                       mime="text/csv")
+                                       data=content,
+                                       file_name=file_name,
+                                       mime=mime)
         else:
             st.download_button(label=disp_text,
-                               data=csv,
-                               file_name=f"{file_name}.csv",
-                               mime="text/csv")
+                               data=content,
+                               file_name=file_name,
+                               mime=mime)
+
+    def submit_job(page, params, name, func, *args):
+        """Run a page job in the background, on the pool of all sessions
+
+        The job id is put in the page URL, so the job can be followed
+        again after a reload (see followed_job).
+
+        Args:
+            page (str): Page name
+            params (tuple): Parameters of the run
+            name (str): Display name, e.g. the input file name
+            func (callable): Job function, called as func(*args, job)
+
+        Returns:
+            Job: New job, or the job already submitted for these params
+        """
+        job = _job_manager().submit((page,) + tuple(params), name, func,
+                                    *args)
+        st.experimental_set_query_params(job=job.id)
+
+        return job
+
+    def cleaner_options(corpus_mode, hooks):
+        """Options of the cleaners run by page jobs
+
+        The cache, checkpoints and corpus come from the MOLDATAPROC_*
+        environment variables. Standardization processes are bounded by
+        JOB_PROCESSES, as the running jobs share the cores.
+
+        Args:
+            corpus_mode (str): Corpus mode, None without corpus
+            hooks (list): Stage hooks, e.g. a StageProfiler and the job
+
+        Returns:
+            dict: Keyword arguments of DataCleaner and BioCleaner
+        """
+        cache = None
+        if STDZ_CACHE:
+            cache = StandardizationCache(STDZ_CACHE)
+
+        corpus = None
+        if corpus_mode is not None:
+            corpus = StructureIndex(CORPUS)
+
+        checkpoint = None
+        if CHECKPOINTS:
+            checkpoint = PipelineCheckpoint(CHECKPOINTS)
+
+        return {"n_jobs": JOB_PROCESSES, "cache": cache, "hooks": hooks,
+                "checkpoint": checkpoint, "corpus": corpus,
+                "corpus_mode": corpus_mode, "backend": STDZ_BACKEND,
+                "timeout": STDZ_TIMEOUT}
+
+    def cleaner_result(cleaner, output, col_smiles, profiler):
+        """Result of a page job, shown by Body.job_result
+
+        Args:
+            cleaner (DataCleaner | BioCleaner): Cleaner of the run
+            output (pd.DataFrame): Cleaned dataframe
+            col_smiles (str): Smiles column
+            profiler (StageProfiler): Profiler of the run
+
+        Returns:
+            dict: Output, SDF content, errors, cache stats, quarantine and
+            stage report
+        """
+        stats = None
+        if cleaner.cache is not None:
+            stats = cleaner.cache.stats()
+            cleaner.cache.close()
+
+        # SDF export, streamed from the molecules of the run
+        molecules = cleaner.store.molecules_of(output[col_smiles])
+        cleaner.store.clear()
+        sdf_data = sdf_bytes(output, col_smiles, molecules,
+                             n_jobs=JOB_PROCESSES)
+
+        return {"output": output, "sdf": sdf_data,
+                "errors": len(cleaner.errors), "cache": stats,
+                "quarantine": cleaner.quarantine.round({"Seconds": 3})
+                .rename_axis("Row").reset_index(),
+                "report": profiler.report()}
+
+    def followed_job(page):
+        """Job of the page whose id is in the page URL
+
+        Args:
+            page (str): Page name
+
+        Returns:
+            Job: Job, or None
+        """
+        job_ids = st.experimental_get_query_params().get("job", [])
+        if not job_ids:
+            return None
+
+        job = _job_manager().get(job_ids[0])
+        if job is None or job.key[0] != page:
+            return None
+
+        return job
 
 
 class Sidebar:
@@ -66,12 +270,13 @@ class Sidebar:
         """
         with st.sidebar.header(title):
             uploaded_file = st.sidebar.file_uploader(file_description,
-                                                     type=["csv", "sdf"])
+                                                     type=UPLOAD_TYPES)
 
             if example_csv_path:
-                exemple_file = pd.read_csv(example_csv_path, delimiter=None)
-                Misc.download_data(exemple_file, example_csv_name,
-                                   example_csv_text)
+                exemple_file = _read_example(example_csv_path)
+                Misc.download_data(exemple_file,
+                                   ("example", example_csv_path),
+                                   example_csv_name, example_csv_text)
 
         return uploaded_file
 
@@ -79,12 +284,15 @@ class Sidebar:
         """Create structure to select multiple columns on sidebar
 
         Args:
-            dataframe (pd.DataFrame): Dataframe
+            dataframe (pd.DataFrame | list): Dataframe or column names
 
         Returns:
             _type_: _description_
         """
-        columns_all = list(dataframe.columns)
+        if isinstance(dataframe, pd.DataFrame):
+            columns_all = list(dataframe.columns)
+        else:
+            columns_all = list(dataframe)
 
         columns = st.sidebar.multiselect(f"**{text}**", columns_all)
 
@@ -105,22 +313,83 @@ class Sidebar:
 
         return column
 
-    def strain_selector(dataframe, col, text="Select desired strain"):
+    def strain_selector(dataframe, col, data_key,
+                        text="Select desired strain"):
         """Create structure to select multiple columns on sidebar
 
         Args:
             dataframe (pd.DataFrame): Dataframe
-            default (list, optional): Default columns selection.
+            col (str): Strain column
+            data_key (str): Stable key of the dataframe (Misc.file_key)
+            text (str, optional): Selector label.
 
         Returns:
             _type_: _description_
         """
-        strain_all = list(dataframe[col].unique())
+        strain_all = _unique_values(data_key, col, dataframe[col])
 
         strain = st.sidebar.multiselect(f"**{text}**", strain_all)
 
         return strain
 
+    def run_button(params, key, text="Run"):
+        """Create a run button that stays pressed across reruns
+
+        The button state is kept in the session until params change, so
+        touching another widget does not discard the processed output.
+
+        Args:
+            params (tuple): Parameters of the run
+            key (str): Session state key
+            text (str, optional): Button label. Defaults to "Run".
+
+        Returns:
+            bool: True if a run was requested for these params
+        """
+        if st.sidebar.button(text):
+            st.session_state[key] = params
+
+        return st.session_state.get(key) == params
+
+    def format_selector(text="Download format"):
+        """Create structure to select the download format on sidebar
+
+        Args:
+            text (str, optional): Label. Defaults to "Download format".
+
+        Returns:
+            str: "csv", "parquet" or "arrow"
+        """
+        name = st.sidebar.selectbox(f"**{text}**", list(DOWNLOAD_FORMATS))
+
+        return DOWNLOAD_FORMATS[name]
+
+    def compression_selector(text="Download compression"):
+        """Create structure to select the download compression on sidebar
+
+        Args:
+            text (str, optional): Label. Defaults to "Download compression".
+
+        Returns:
+            str: Compression name, or None
+        """
+        compression = st.sidebar.selectbox(
+            f"**{text}**", ["None"] + available_compressions())
+
+        return None if compression == "None" else compression
+
+    def corpus_mode_selector(text="Rows already in the corpus"):
+        """Create structure to flag or drop rows found in the corpus
+
+        Args:
+            text (str, optional): Label.
+
+        Returns:
+            str: "flag" or "drop"
+        """
+        return st.sidebar.radio(f"**{text}**", CORPUS_MODES,
+                                format_func=str.capitalize)
+
     def slice_data(dataframe):
         """Create structure to slice data on sidebar
 
@@ -170,3 +439,200 @@ class Body:
             st.error("""Plase check your data or column selection""")
 
             return pd.DataFrame()
+
+    def data_preview(placeholder, dataframe, key, data_key,
+                     rows=PREVIEW_ROWS):
+        """Display one page or a random sample of a dataframe
+
+        Only the displayed rows and columns are sent to the browser. The
+        shape and the per-column summary are computed on the server.
+
+        Args:
+            placeholder (st.empty): Placeholder to display in
+            dataframe (pd.DataFrame): Dataframe
+            key (str): Widget key prefix, unique per preview of a page
+            data_key (str): Identity of the data (e.g. file hash), the
+                summary is cached on it
+            rows (int, optional): Rows per page or sample.
+        """
+        n_pages = max(1, -(-len(dataframe) // rows))
+
+        with placeholder.container():
+            col_mode, col_value = st.columns(2)
+            mode = col_mode.radio("Preview", ["Page", "Sample"],
+                                  horizontal=True, key=f"{key}_mode")
+            columns = st.multiselect("Columns (all if empty)",
+                                     list(dataframe.columns),
+                                     key=f"{key}_columns")
+
+            if mode == "Page":
+                # Keyed on the page count: a new size restarts at page 1
+                page = col_value.number_input(f"Page (of {n_pages})",
+                                              min_value=1,
+                                              max_value=n_pages,
+                                              key=f"{key}_page_{n_pages}")
+                view = dataframe.iloc[(page - 1) * rows:page * rows]
+            else:
+                seed = col_value.number_input("Sample seed", min_value=0,
+                                              key=f"{key}_seed")
+                view = dataframe.sample(n=min(rows, len(dataframe)),
+                                        random_state=seed)
+
+            if columns:
+                view = view[columns]
+            st.dataframe(view)
+
+            with st.expander("Column summary"):
+                st.dataframe(_column_summary(data_key, dataframe),
+                             use_container_width=True)
+
+    def stage_report(report):
+        """Display the per-stage report of a cleaning run
+
+        Args:
+            report (pd.DataFrame): StageProfiler.report() output
+        """
+        with st.expander("Stage report"):
+            st.dataframe(report.style.format(precision=3, na_rep="-"),
+                         use_container_width=True)
+
+    def job_result(result, job, page, fmt, compression, data_disp,
+                   info_down):
+        """Display the result of a page job with its downloads
+
+        Args:
+            result (dict): Misc.cleaner_result output
+            job (Job): Job
+            page (str): Page name
+            fmt (str): Table download format
+            compression (str): Download compression, None for none
+            data_disp (st.empty): Output preview placeholder
+            info_down (st.empty): Output shape placeholder
+        """
+        output = result["output"]
+
+        Body.data_preview(data_disp, output, f"{page}_output", job.id)
+        info_down.info(f"Output shape: {output.shape}")
+        if result["cache"] is not None:
+            st.info(f"Standardization cache: {result['cache']['hits']} "
+                    f"hits, {result['cache']['misses']} misses")
+        if result["errors"] > 0:
+            st.warning(f"{result['errors']} molecules could not be "
+                       "standardized and were removed")
+        quarantine = result["quarantine"]
+        if len(quarantine) > 0:
+            st.warning(f"{len(quarantine)} molecules took more than "
+                       f"{STDZ_TIMEOUT} s to standardize and were "
+                       "quarantined")
+
+        Body.stage_report(result["report"])
+
+        Misc.download_data(output, (job.id, "output"), job.name,
+                           disp_text="Download table", fmt=fmt,
+                           compression=compression)
+
+        # Download SDF
+        Misc.download_bytes(result["sdf"], f"{job.name}.sdf",
+                            "Download SDF", compression=compression)
+
+        if len(quarantine) > 0:
+            Misc.download_data(quarantine, (job.id, "quarantine"),
+                               f"{job.name}_quarantine",
+                               disp_text="Download quarantine")
+
+    def job_progress(job, run_key=None, interval=0.5):
+        """Display the progress of a job until it ends
+
+        The running stage and its progress are shown with a cancel button.
+        Leaving the page does not stop the job.
+
+        Args:
+            job (Job): Job
+            run_key (str, optional): Run button session key, reset if the
+                job is cancelled or fails.
+            interval (float, optional): Refresh interval (s).
+
+        Returns:
+            dict: Job result, or None if it was cancelled or failed
+        """
+        if not job.done():
+            cancel = st.empty()
+            if cancel.button("Cancel", key=f"cancel_{job.id}"):
+                job.cancel()
+
+            bar = st.progress(job.fraction(), text=job.message())
+            while not job.done():
+                bar.progress(job.fraction(), text=job.message())
+                time.sleep(interval)
+
+            bar.empty()
+            cancel.empty()
+
+        if job.status == "done":
+            return job.result
+
+        if run_key is not None:
+            st.session_state.pop(run_key, None)
+
+        if job.status == "failed":
+            st.error(f"Processing failed: {job.error}")
+        else:
+            st.warning("Processing cancelled")
+
+        return None
+
+
+@st.cache_data(max_entries=MAX_UPLOADS, show_spinner=False)
+def _read_upload(file_key, fmt, compression, columns, _content):
+    # Keyed on the content hash, the raw bytes are not hashed again
+    if columns is not None:
+        columns = list(columns)
+
+    return read_table(io.BytesIO(_content), fmt, columns, n_jobs=SDF_JOBS,
+                      compression=compression)
+
+
+@st.cache_data(max_entries=MAX_UPLOADS, show_spinner=False)
+def _read_columns(file_key, fmt, _content):
+    return read_columns(io.BytesIO(_content), fmt)
+
+
+@st.cache_resource(show_spinner=False)
+def _job_manager():
+    # One pool for every session of the server
+    return JobManager(JOB_WORKERS, MAX_JOBS)
+
+
+@st.cache_data(show_spinner=False)
+def _read_example(path):
+    return pd.read_csv(path, delimiter=None)
+
+
+@st.cache_data(max_entries=MAX_FRAMES, show_spinner=False)
+def _to_bytes(data_key, fmt, _data):
+    # Keyed on data_key: hashing samples large frames and ignores names
+    return table_bytes(_data, fmt)
+
+
+@st.cache_data(max_entries=MAX_FRAMES, show_spinner=False)
+def _compress(content, compression, file_name):
+    return compress(content, compression, member=file_name)
+
+
+@st.cache_data(max_entries=MAX_FRAMES, show_spinner=False)
+def _column_summary(data_key, _dataframe):
+    # Keyed on data_key, the frame itself is not hashed
+    numeric = _dataframe.select_dtypes("number")
+
+    return pd.DataFrame({"Type": _dataframe.dtypes.astype(str),
+                         "Non-null": _dataframe.count(),
+                         "Unique": _dataframe.nunique(),
+                         "Min": numeric.min(),
+                         "Max": numeric.max(),
+                         "Mean": numeric.mean()}).reindex(_dataframe.columns)
+
+
+@st.cache_data(max_entries=MAX_FRAMES, show_spinner=False)
+def _unique_values(data_key, col, _column):
+    # Keyed on data_key and col, the column itself is not hashed
+    return list(_column.unique())
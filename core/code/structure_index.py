@@ -0,0 +1,139 @@
+import hashlib
+import os
+
+import numpy as np
+
+CORPUS_MODES = ["flag", "drop"]
+
+
+class StructureIndex:
+    """Sorted on-disk array of 64-bit hashes of standardized Smiles
+
+    The index is a single .npy file of sorted uint64 values (8 bytes per
+    compound), opened memory-mapped, so checking rows against tens of
+    millions of compounds only touches the pages binary search needs.
+    Two different Smiles share a hash with probability ~n^2 / 2^65.
+
+    New Smiles are buffered by add and written by flush, so a run that
+    adds compounds chunk by chunk rewrites the file only once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hashes = self._load()
+        self.pending = []
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def version(self):
+        """Modification time of the index file (0 if not created yet)
+
+        Returns:
+            float: Version to invalidate results computed on older indexes
+        """
+        if not os.path.exists(self.path):
+            return 0.0
+
+        return os.path.getmtime(self.path)
+
+    def contains(self, smiles):
+        """Check which Smiles are in the index
+
+        Args:
+            smiles (Iterable): Standardized Smiles
+
+        Returns:
+            np.ndarray: Boolean mask, one value per Smiles
+        """
+        hashes = structure_hashes(smiles)
+        if len(self.hashes) == 0 or len(hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+
+        # Sorted queries walk the memory map in one direction
+        order = np.argsort(hashes, kind="stable")
+        queries = hashes[order]
+        pos = np.searchsorted(self.hashes, queries)
+        pos[pos == len(self.hashes)] = 0
+
+        found = np.empty(len(hashes), dtype=bool)
+        found[order] = np.asarray(self.hashes[pos]) == queries
+
+        return found
+
+    def add(self, smiles):
+        """Buffer Smiles to add to the index on the next flush
+
+        Args:
+            smiles (Iterable): Standardized Smiles
+
+        Returns:
+            int: Number of compounds not in the index
+        """
+        hashes = np.unique(structure_hashes(smiles))
+        hashes = hashes[~self._contains_hashes(hashes)]
+
+        if len(hashes) > 0:
+            self.pending.append(hashes)
+
+        return len(hashes)
+
+    def flush(self):
+        """Add the buffered Smiles to the index and save it
+
+        Returns:
+            int: Number of new compounds
+        """
+        if len(self.pending) == 0:
+            return 0
+
+        # Reloaded, so compounds saved by another run are kept
+        self.hashes = self._load()
+        hashes = np.unique(np.concatenate(self.pending))
+        hashes = hashes[~self._contains_hashes(hashes)]
+        self.pending = []
+
+        if len(hashes) == 0:
+            return 0
+
+        # Both arrays are sorted: inserting keeps the index sorted
+        merged = np.insert(np.asarray(self.hashes),
+                           np.searchsorted(self.hashes, hashes), hashes)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, merged)
+        os.replace(tmp_path, self.path)
+        self.hashes = self._load()
+
+        return len(hashes)
+
+    def _contains_hashes(self, hashes):
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+
+        pos = np.searchsorted(self.hashes, hashes)
+        pos[pos == len(self.hashes)] = 0
+
+        return np.asarray(self.hashes[pos]) == hashes
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return np.empty(0, dtype=np.uint64)
+
+        return np.load(self.path, mmap_mode="r")
+
+
+def structure_hashes(smiles):
+    """64-bit BLAKE2b hash of each Smiles
+
+    Args:
+        smiles (Iterable): Smiles
+
+    Returns:
+        np.ndarray: uint64 hashes
+    """
+    digests = b"".join(hashlib.blake2b(str(smi).encode("utf-8"),
+                                       digest_size=8).digest()
+                       for smi in smiles)
+
+    return np.frombuffer(digests, dtype="<u8").astype(np.uint64)
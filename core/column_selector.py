@@ -15,16 +15,23 @@ str_2 = ("Others:  **:red[ID]**, **:red[Smiles]**, **:red[Labels]**, "
 def select_cols():
     uploaded_file = None
     uploaded_file = Sidebar.file_uploader("Upload data",
-                                          "Upload CSV or SDF file",
+                                          "Upload CSV, SDF, Parquet or "
+                                          "Arrow file",
                                           EXAMPLE)
 
     if uploaded_file:
         file_name = uploaded_file.name.split(".")[0]
-        data = Misc.load_csv_sdf(uploaded_file)
+        file_key = Misc.file_key(uploaded_file)
+        columns = Misc.file_columns(uploaded_file)
 
         st.sidebar.markdown(str_1)
         st.sidebar.markdown(str_2)
-        sel_col = Sidebar.multicolumn_selector(data, "Select columns")
+        sel_col = Sidebar.multicolumn_selector(columns, "Select columns")
+        fmt = Sidebar.format_selector()
+        compression = Sidebar.compression_selector()
+
+        # Parquet and Arrow files only read the selected columns
+        data = Misc.load_csv_sdf(uploaded_file, sel_col or None)
 
         # Set displays placeholders
         title = st.empty()
@@ -33,15 +40,16 @@ def select_cols():
 
         # Display input data
         title.subheader("Data")
-        data_disp.dataframe(data)
+        Body.data_preview(data_disp, data, "select_cols",
+                          (file_key, tuple(sel_col)))
         info_down.info(f"Input shape: {data.shape}")
 
         if len(sel_col) > 0:
-            output = data[sel_col]
-            data_disp.dataframe(output)
+            output = data
             info_down.info(f"Output shape: {output.shape}")
 
-            Misc.download_data(output, file_name,
-                               disp_text="Download")
+            Misc.download_data(output, (file_key, tuple(sel_col)),
+                               file_name, disp_text="Download", fmt=fmt,
+                               compression=compression)
     else:
         Body.awating_upload()
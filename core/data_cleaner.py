@@ -1,25 +1,22 @@
-import os
 import streamlit as st
-from rdkit.Chem import PandasTools
 
-from core.code.streamlit_structure import Sidebar, Body, Misc
+from core.code.streamlit_structure import CORPUS, Sidebar, Body, Misc
 from core.code.clean_process import DataCleaner
+from core.code.profiling import StageProfiler
+from core.code.structure_index import StructureIndex
 
 EXAMPLE = "./core/files/example_cleaner.csv"
-SDF_OUT = "./core/files/out_sdf.sdf"
+PAGE = "cleaner"
 
 
 def cleaner():
     uploaded_file = None
     uploaded_file = Sidebar.file_uploader("Upload data",
-                                          "Upload CSV or SDF file",
+                                          "Upload CSV, SDF, Parquet or "
+                                          "Arrow file",
                                           EXAMPLE)
 
     if uploaded_file:
-        # Delete SDF from lib folder
-        if os.path.exists(SDF_OUT):
-            os.remove(SDF_OUT)
-
         # Load data
         file_name = uploaded_file.name.split(".")[0]
         data = Misc.load_csv_sdf(uploaded_file)
@@ -28,6 +25,13 @@ def cleaner():
         col_smls = Sidebar.column_selector(data, "Select :red[Smiles] column")
         col_label = Sidebar.column_selector(data, "Select :red[Label] column")
         task = st.sidebar.radio("Task", ("Classification", "Regression"))
+        fmt = Sidebar.format_selector()
+        compression = Sidebar.compression_selector()
+
+        corpus_mode, corpus_version = None, None
+        if CORPUS:
+            corpus_mode = Sidebar.corpus_mode_selector()
+            corpus_version = StructureIndex(CORPUS).version()
 
         # Set displays placeholders
         info_up = st.empty()
@@ -37,34 +41,48 @@ def cleaner():
 
         # Display input data
         title.subheader("Input")
-        data_disp.dataframe(data)
+        Body.data_preview(data_disp, data, f"{PAGE}_input",
+                          Misc.file_key(uploaded_file))
         info_down.info(f"Input shape: {data.shape}")
 
-        if st.sidebar.button("Run"):
-            with st.spinner("Please wait"):
-                # Run processing
-                dclean = DataCleaner(col_smls, col_label)
-                output = dclean.clean(data, task)
-
-            # Display output data
-            title.subheader("Output")
-            data_disp.dataframe(output)
-            info_up.info(f"Input shape: {data.shape}")
-            info_down.info(f"Output shape: {output.shape}")
-
-            Misc.download_data(output, file_name,
-                               disp_text="Download CSV")
-
-            # Download SDF
-            output_sdf = output.copy(deep=True)
-            PandasTools.AddMoleculeColumnToFrame(output_sdf, col_smls, "ROMol")
-            PandasTools.WriteSDF(output_sdf, SDF_OUT,
-                                 molColName="ROMol",
-                                 idName="RowID",
-                                 properties=list(output_sdf.columns))
-            with open(SDF_OUT, "rb") as sdf:
-                st.download_button("Download SDF", sdf,
-                                   file_name=f"{file_name}.sdf")
+        params = (Misc.file_key(uploaded_file), col_smls, col_label, task,
+                  corpus_mode, corpus_version)
+        if Sidebar.run_button(params, "cleaner_run"):
+            # Run processing in the background (one job per file and params)
+            job = Misc.submit_job(PAGE, params, file_name, _run_cleaner,
+                                  *params, data)
+            result = Body.job_progress(job, "cleaner_run")
+
+            if result is not None:
+                # Display output data
+                title.subheader("Output")
+                info_up.info(f"Input shape: {data.shape}")
+                Body.job_result(result, job, PAGE, fmt, compression,
+                                data_disp, info_down)
 
     else:
-        Body.awating_upload()
+        # Reconnect to a job started before the page was reloaded
+        job = Misc.followed_job(PAGE)
+
+        if job is None:
+            Body.awating_upload()
+        else:
+            fmt = Sidebar.format_selector()
+            compression = Sidebar.compression_selector()
+            st.subheader(f"Output: {job.name}")
+            result = Body.job_progress(job)
+
+            if result is not None:
+                Body.job_result(result, job, PAGE, fmt, compression,
+                                st.empty(), st.empty())
+
+
+def _run_cleaner(file_key, col_smls, col_label, task, corpus_mode,
+                 corpus_version, data, job):
+    profiler = StageProfiler()
+    dclean = DataCleaner(col_smls, col_label,
+                         **Misc.cleaner_options(corpus_mode,
+                                                [profiler, job]))
+    output = dclean.clean(data, task)
+
+    return Misc.cleaner_result(dclean, output, col_smls, profiler)
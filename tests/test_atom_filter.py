@@ -0,0 +1,40 @@
+"""filter_atoms with AtomFilter against the full parse of every row"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.code.clean_process import DataCleaner
+
+SMILES_CASES = {
+    "organic": ["CCO", "c1ccccc1", "CC(=O)Nc1ccc(O)cc1", "FC(F)(F)I"],
+    "explicit_h": ["[H]C([H])([H])O", "[H][H]", "[2H]C([2H])([2H])O",
+                   "[2H]O[2H]", "[CH4]", "[H]Cl", "[H]OC"],
+    "isotopes": ["[13CH3]O", "[14C]C", "C[15NH2]", "[18F]", "[11B]C"],
+    "charged": ["C[N+](C)(C)C", "CC(=O)[O-]", "[Na+].[Cl-]", "[NH4+]",
+                "C[O-].[K+]", "[Fe+2]CC", "[Cl-]"],
+    "aromatic": ["c1cc[se]c1", "c1cc[te]c1", "c1ccsc1", "c1ccoc1",
+                 "c1cc[nH]c1", "c1ccbc1", "C[as]C"],
+    "dummy": ["*CC", "C*", "[*]C", "[1*]CO", "**"],
+    "ring_digits": ["Cl1CCCC1", "C1CC1Cl", "BrC1CC1Br", "ClC1CCC1Cl",
+                    "C%10CC%10Br", "Cc1ccccc1Cl", "B1CC1", "Br1CCC1"],
+    "suffixes": ["CCO |$;;$|", "CCO name", "CCO\tname", "c1ccccc1 |c:1|",
+                 " CCO", "[Na+].[Cl-] salt", "C |$_R1;$|", "CC\n"],
+    "unparsable": ["not a smiles", "C1CC", "C(C", "Xx", "[Zz]C", "CC)",
+                   "c1cccc1", "", "[C", "C=1CC"],
+    "small": ["C", "O", "[Cl-]", "[H]", "I", "[Na]", "N.[H]", "Q"],
+    "nan": [np.nan, None, "nan", "CCN"],
+}
+
+
+@pytest.mark.parametrize("case", list(SMILES_CASES))
+def test_fast_filter_matches_full_parse(case):
+    smiles = SMILES_CASES[case]
+    dataframe = pd.DataFrame({"Smiles": smiles,
+                              "Labels": np.arange(len(smiles))},
+                             index=np.arange(len(smiles))[::-1] + 10)
+
+    fast = DataCleaner("Smiles", "Labels", fast_filter=True)
+    slow = DataCleaner("Smiles", "Labels", fast_filter=False)
+
+    pd.testing.assert_frame_equal(fast.filter_atoms(dataframe),
+                                  slow.filter_atoms(dataframe))
@@ -0,0 +1,110 @@
+"""Resuming cleaning runs from PipelineCheckpoint"""
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import bio_dataset, cleaner_dataset
+from core.code import clean_process
+from core.code.checkpoint import PipelineCheckpoint
+from core.code.clean_process import BioCleaner, DataCleaner
+
+CONV = ["Molecular Weight", "Standard Relation", "Standard Value",
+        "Standard Units"]
+
+
+@pytest.fixture
+def standardized(monkeypatch):
+    # Number of molecules sent to the standardizer in each call
+    calls = []
+    standardize_mols = clean_process.standardize_mols
+
+    def count(mols, *args):
+        calls.append(len(mols))
+        return standardize_mols(mols, *args)
+
+    monkeypatch.setattr(clean_process, "standardize_mols", count)
+
+    return calls
+
+
+def _clean(dataframe, directory=None):
+    checkpoint = None
+    if directory is not None:
+        checkpoint = PipelineCheckpoint(str(directory))
+
+    dclean = DataCleaner("Smiles", "Labels", checkpoint=checkpoint)
+
+    return dclean.clean(dataframe, "Classification"), dclean
+
+
+def _bio_clean(dataframe, strains, threshold, directory=None):
+    checkpoint = None
+    if directory is not None:
+        checkpoint = PipelineCheckpoint(str(directory))
+
+    bclean = BioCleaner("Smiles", "Assay Organism", CONV,
+                        checkpoint=checkpoint)
+
+    return bclean.bio_clean(dataframe, strains, threshold), checkpoint
+
+
+def test_rerun_loads_every_stage(tmp_path, standardized):
+    dataframe = cleaner_dataset(80, seed=1)
+    expected, _ = _clean(dataframe, tmp_path)
+    assert sum(standardized) > 0
+
+    standardized.clear()
+    result, dclean = _clean(dataframe, tmp_path)
+
+    assert dclean.checkpoint.resumed == ["remove_nan", "filter_atoms",
+                                         "remove_duplicates"]
+    assert sum(standardized) == 0
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("strains, threshold, resumed", [
+    (["Strain 0", "Strain 1"], 5000, ["select_strains", "remove_nan",
+                                      "filter_units", "filter_atoms"]),
+    (["Strain 0", "Strain 2"], 1000, []),
+])
+def test_changed_parameters_match_fresh_run(tmp_path, standardized,
+                                            strains, threshold, resumed):
+    dataframe = bio_dataset(150, n_strains=3, seed=2)
+    _bio_clean(dataframe, ["Strain 0", "Strain 1"], 1000, tmp_path)
+
+    standardized.clear()
+    result, checkpoint = _bio_clean(dataframe, strains, threshold, tmp_path)
+    rerun = sum(standardized)
+
+    standardized.clear()
+    expected, _ = _bio_clean(dataframe, strains, threshold)
+
+    assert checkpoint.resumed == resumed
+    # Rows standardized by the first run are reused
+    assert rerun < sum(standardized)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_unreadable_files_are_ignored(tmp_path, standardized):
+    dataframe = cleaner_dataset(40, seed=4)
+    expected, _ = _clean(dataframe, tmp_path)
+
+    for name in os.listdir(tmp_path):
+        path = os.path.join(tmp_path, name)
+        with open(path, "rb") as file:
+            data = file.read()
+        with open(path, "wb") as file:
+            file.write(data[:len(data) // 2])
+
+    standardized.clear()
+    result, dclean = _clean(dataframe, tmp_path)
+
+    assert dclean.checkpoint.resumed == []
+    assert sum(standardized) > 0
+    pd.testing.assert_frame_equal(result, expected)
+
+    # The stages saved their output again
+    result, dclean = _clean(dataframe, tmp_path)
+    assert len(dclean.checkpoint.resumed) == 3
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,227 @@
+"""Grouped and vectorized stages against the original loop versions
+
+The _baseline_* functions are the loops the stages replaced, kept here
+as the reference behaviour.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.code.clean_process import VALID_UNITS, BioCleaner, DataCleaner
+
+CONV = ["Molecular Weight", "Standard Relation", "Standard Value",
+        "Standard Units"]
+THRESHOLD = 1000
+
+
+def _baseline_remove_duplicates(dataframe, task, col_smiles, col_label):
+    unique_smiles = dataframe[col_smiles].unique()
+    df = pd.DataFrame()
+
+    for uni_smiles in unique_smiles:
+        selection = dataframe[dataframe[col_smiles] == uni_smiles]
+
+        if len(selection) == 1:
+            df = pd.concat([df, selection], axis=0)
+
+        else:
+            unique_labels = selection[col_label].unique()
+
+            if len(unique_labels) == 1:
+                selection = selection.drop_duplicates(subset=[col_smiles])
+            elif task == "Classification":
+                selection = pd.DataFrame()
+            else:
+                mean_average = selection[col_label].mean()
+                selection = selection.drop_duplicates(subset=[col_smiles])
+                selection[col_label] = mean_average
+
+            df = pd.concat([df, selection], axis=0)
+
+    return df
+
+
+def _baseline_remove_bioduplicates(dataframe, col_smiles):
+    unique_smiles = dataframe[col_smiles].unique()
+    df = pd.DataFrame()
+
+    for uni_smiles in unique_smiles:
+        selection = dataframe[dataframe[col_smiles] == uni_smiles]
+
+        if len(selection) > 1:
+            df_sub = selection["Converted Value"]
+
+            if len(df_sub.unique()) == 1:
+                selection = selection.drop_duplicates(subset=[col_smiles])
+            elif len(selection["Activity"].unique()) == 1:
+                selection = selection[df_sub == df_sub.max()].iloc[:1]
+            else:
+                selection = pd.DataFrame()
+
+        df = pd.concat([df, selection], axis=0)
+
+    return df
+
+
+def _baseline_convert_units(dataframe, threshold):
+    mol_weight, standard_relation, standard_value, standard_units = CONV
+
+    dataframe = dataframe[dataframe[standard_units].isin(VALID_UNITS)].copy()
+    list_weight = list(dataframe[mol_weight])
+    list_relations = list(dataframe[standard_relation])
+    list_values = list(dataframe[standard_value])
+    list_units = list(dataframe[standard_units])
+
+    converted_values = []
+    for idx, unit in enumerate(list_units):
+        if unit == "ug.mL-1":
+            val = (list_values[idx] / float(list_weight[idx])) * 1000
+        elif unit == "uM":
+            val = list_values[idx] * 1000
+        elif unit == "nM":
+            val = list_values[idx]
+
+        converted_values.append(val)
+
+    converted_activity = ["Inactive"] * len(list_values)
+    converted_activity_bin = [0] * len(list_values)
+
+    for idx, value in enumerate(converted_values):
+        if (">" not in list_relations[idx]) and (value < threshold):
+            converted_activity[idx] = "Active"
+            converted_activity_bin[idx] = 1
+
+    last_col = len(dataframe.columns)
+    dataframe.insert(last_col, "Converted Value", converted_values)
+    dataframe.insert(last_col + 1, "Converted Units",
+                     ["nM"] * len(list_values))
+    dataframe.insert(last_col + 2, "Activity", converted_activity)
+    dataframe.insert(last_col + 3, "Bin Activity", converted_activity_bin)
+
+    dataframe = dataframe[~((dataframe[standard_relation] == "'>'") &
+                            (dataframe["Converted Value"] < threshold))]
+    dataframe = dataframe[~((dataframe[standard_relation] == "'>='") &
+                            (dataframe["Converted Value"] < threshold))]
+
+    return dataframe
+
+
+def _assert_same(result, expected, dataframe, check_dtype=True):
+    # The loops returned a frame without columns when every row was dropped
+    if len(expected) == 0:
+        assert len(result) == 0
+        assert list(result.columns) == list(dataframe.columns)
+    else:
+        pd.testing.assert_frame_equal(result, expected,
+                                      check_dtype=check_dtype)
+
+
+def _frame(smiles, labels):
+    # Shuffled index: rows are matched by label, not by position
+    index = np.random.default_rng(0).permutation(len(smiles)) + 10
+
+    return pd.DataFrame({"ID": [f"id{idx}" for idx in index],
+                         "Smiles": smiles, "Labels": labels}, index=index)
+
+
+DUPLICATE_CASES = {
+    "single_rows": (["C", "CC", "CCC"], [1, 0, 1]),
+    "agreeing_labels": (["C", "CC", "C", "CC", "C"], [1, 0, 1, 0, 1]),
+    "conflicting_labels": (["C", "CC", "C", "CCO", "CC"], [1, 0, 0, 1, 0]),
+    "all_conflicting": (["C", "C", "CC", "CC"], [1, 0, 0, 1]),
+    "nan_labels": (["C", "C", "CC", "CC", "CCO"],
+                   [np.nan, np.nan, 1.0, np.nan, np.nan]),
+    "nan_smiles": (["C", np.nan, "C", np.nan, "CC"], [1, 1, 1, 0, 0]),
+    "float_labels": (["C", "CC", "C", "C", "CC"],
+                     [0.5, 2.0, 1.5, 0.5, 2.0]),
+    "text_labels": (["C", "CC", "C", "CC"],
+                    ["active", "active", "active", "inactive"]),
+}
+
+
+@pytest.mark.parametrize("task", ["Classification", "Regression"])
+@pytest.mark.parametrize("case", list(DUPLICATE_CASES))
+def test_remove_duplicates_matches_loop(case, task):
+    smiles, labels = DUPLICATE_CASES[case]
+    if task == "Regression" and case == "text_labels":
+        pytest.skip("text labels have no mean")
+
+    dataframe = _frame(smiles, labels)
+    dclean = DataCleaner("Smiles", "Labels")
+
+    result = dclean.remove_duplicates(dataframe, task)
+    expected = _baseline_remove_duplicates(dataframe, task, "Smiles",
+                                           "Labels")
+
+    # The loop made an empty NaN Smiles group with a NaN mean label, which
+    # cast the Regression labels to float; the values are the same
+    _assert_same(result, expected, dataframe,
+                 check_dtype=(case, task) != ("nan_smiles", "Regression"))
+
+
+def _bio_frame(smiles, values, activity):
+    frame = _frame(smiles, [0] * len(smiles)).drop(columns="Labels")
+
+    return frame.assign(**{"Converted Value": values,
+                           "Activity": activity})
+
+
+BIO_CASES = {
+    "single_rows": (["C", "CC"], [1.0, 2.0], ["Active", "Inactive"]),
+    "same_values": (["C", "C", "CC", "C"], [5.0, 5.0, 1.0, 5.0],
+                    ["Active"] * 4),
+    "max_value": (["C", "C", "C", "CC"], [5.0, 9.0, 7.0, 1.0],
+                  ["Active"] * 4),
+    "tied_max": (["CC", "C", "C", "C", "CC"], [2.0, 9.0, 3.0, 9.0, 2.0],
+                 ["Inactive"] * 5),
+    "conflicting_activity": (["C", "CC", "C"], [5.0, 1.0, 9.0],
+                             ["Active", "Active", "Inactive"]),
+    "nan_values": (["C", "C", "CC", "CC"], [np.nan, 4.0, np.nan, np.nan],
+                   ["Active"] * 4),
+    "nan_smiles": ([np.nan, "C", np.nan, "C"], [1.0, 2.0, 3.0, 2.0],
+                   ["Active"] * 4),
+}
+
+
+@pytest.mark.parametrize("case", list(BIO_CASES))
+def test_remove_bioduplicates_matches_loop(case):
+    dataframe = _bio_frame(*BIO_CASES[case])
+    bclean = BioCleaner("Smiles", "Assay Organism", CONV)
+
+    result = bclean.remove_bioduplicates(dataframe)
+    expected = _baseline_remove_bioduplicates(dataframe, "Smiles")
+
+    _assert_same(result, expected, dataframe)
+
+
+UNIT_CASES = {
+    "nM_only_int": (["nM", "nM", "nM"], [10, 2000, 1000],
+                    ["'='", "'='", "'='"]),
+    "mixed_units": (["nM", "uM", "ug.mL-1", "mM"], [10.0, 2.0, 50.0, 1.0],
+                    ["'='", "'<'", "'='", "'='"]),
+    "mass_int_values": (["ug.mL-1", "nM", "uM"], [50, 10, 3],
+                        ["'='", "'='", "'='"]),
+    "greater_relations": (["nM", "nM", "uM", "nM", "nM"],
+                          [10.0, 5000.0, 0.5, 999.0, 1000.0],
+                          ["'>'", "'>'", "'>='", "'>='", "'>'"]),
+    "threshold_ties": (["nM", "uM", "nM"], [1000.0, 1.0, 999.999],
+                       ["'='", "'='", "'<='"]),
+    "invalid_only": (["mM", "%"], [1.0, 2.0], ["'='", "'='"]),
+}
+
+
+@pytest.mark.parametrize("case", list(UNIT_CASES))
+def test_convert_units_matches_loop(case):
+    units, values, relations = UNIT_CASES[case]
+    dataframe = _frame(["C"] * len(units), [0] * len(units)).assign(**{
+        "Molecular Weight": 250.0, "Standard Relation": relations,
+        "Standard Value": values, "Standard Units": units})
+    bclean = BioCleaner("Smiles", "Assay Organism", CONV)
+
+    result = bclean.convert_units(dataframe, THRESHOLD)
+    expected = _baseline_convert_units(dataframe, THRESHOLD)
+
+    if len(expected) == 0:
+        assert len(result) == 0
+    else:
+        pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,102 @@
+"""Per-molecule time limit of the standardization workers"""
+import multiprocessing
+import os
+import time
+
+import pandas as pd
+import pytest
+from rdkit import Chem
+
+from core.code import standardize
+from core.code.clean_process import DataCleaner
+from core.code.standardize import WORKER_CRASHED, Timeout, standardize_mols
+from core.code.stdz_cache import StandardizationCache
+
+SLOW = "CCCCCCCCCC"
+CRASH = "CCCCCCCCCCO"
+TIMEOUT = 1.0
+
+# The stub backend reaches the workers through the patched module
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                reason="workers do not inherit patches")
+
+
+class StubStandardizer:
+    """Leaves molecules as they are, except SLOW (hangs) and CRASH"""
+
+    def standardize(self, mol):
+        smiles = Chem.MolToSmiles(mol)
+        if smiles == SLOW:
+            time.sleep(60)
+        elif smiles == CRASH:
+            os._exit(1)
+
+        return mol
+
+    def fragment_parent(self, mol):
+        return mol
+
+
+@pytest.fixture(autouse=True)
+def stub_backend(monkeypatch):
+    monkeypatch.setattr(standardize, "get_standardizer",
+                        lambda backend="molvs": StubStandardizer())
+
+
+def _smiles(results):
+    return [smiles for smiles, _, _ in results]
+
+
+def test_slow_molecule_times_out():
+    mols = ["CCO", "CCN", SLOW, "CCC", "CCCl"]
+    results = standardize_mols(mols, chunk_size=len(mols), timeout=TIMEOUT)
+
+    error = results[2][2]
+    assert isinstance(error, Timeout)
+    assert TIMEOUT <= error.seconds < TIMEOUT + 5
+
+    # The rest of the chunk goes on in a new worker, in input order
+    assert _smiles(results) == ["CCO", "CCN", None, "CCC", "CCCl"]
+    assert [error for _, _, error in results[:2] + results[3:]] == [None] * 4
+
+
+def test_crashed_worker_is_replaced(monkeypatch):
+    started = []
+    process = multiprocessing.Process
+
+    def start(*args, **kwargs):
+        started.append(process(*args, **kwargs))
+        return started[-1]
+
+    monkeypatch.setattr(standardize.multiprocessing, "Process", start)
+
+    mols = ["CCO", CRASH, "CCN", "CCC", CRASH, "CCCl"]
+    results = standardize_mols(mols, n_jobs=2, chunk_size=3,
+                               timeout=TIMEOUT)
+
+    # Two workers, each replaced once to finish its chunk
+    assert len(started) == 4
+
+    assert [error for _, _, error in results] == [
+        None, WORKER_CRASHED, None, None, WORKER_CRASHED, None]
+    assert _smiles(results) == ["CCO", None, "CCN", "CCC", None, "CCCl"]
+
+
+def test_timed_out_rows_are_quarantined(tmp_path):
+    cache = StandardizationCache(str(tmp_path / "cache.db"))
+    dataframe = pd.DataFrame({"Smiles": ["CCO", SLOW, "CCN", "CCC"],
+                              "Labels": [1, 0, 1, 0]},
+                             index=[30, 10, 40, 20])
+
+    dclean = DataCleaner("Smiles", "Labels", cache=cache, timeout=TIMEOUT)
+    df = dclean.standardize_smiles(dataframe)
+
+    assert df.index.tolist() == [30, 40, 20]
+    assert df["Smiles"].tolist() == ["CCO", "CCN", "CCC"]
+    assert dclean.quarantine.index.tolist() == [10]
+    assert dclean.quarantine.loc[10, "Smiles"] == SLOW
+    assert dclean.quarantine.loc[10, "Seconds"] >= TIMEOUT
+    assert len(dclean.errors) == 0
+
+    assert cache.get_many(["CCO", SLOW, "CCN", "CCC"]) == {
+        "CCO": "CCO", "CCN": "CCN", "CCC": "CCC"}
@@ -0,0 +1,90 @@
+"""StandardizationCache eviction, version checks and hit accounting"""
+import itertools
+
+import pytest
+import rdkit
+
+from core.code import stdz_cache
+from core.code.stdz_cache import StandardizationCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Entries written in one put_many share a timestamp; a ticking clock
+    # makes the least recently used order explicit
+    ticks = itertools.count()
+    monkeypatch.setattr(stdz_cache.time, "time", lambda: next(ticks))
+
+
+def _cached(cache, smiles_list):
+    # Read the table directly, get_many would refresh the entries
+    keys = {row[0] for row in cache.conn.execute("SELECT key FROM smiles")}
+
+    return [smiles for smiles in smiles_list
+            if stdz_cache._key(smiles, "molvs") in keys]
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = StandardizationCache(tmp_path / "cache.db", max_entries=3)
+    for smiles in ["C", "CC", "CCC"]:
+        cache.put_many({smiles: smiles})
+
+    cache.get_many(["C"])
+    cache.put_many({"CCCC": "CCCC"})
+
+    assert len(cache) == 3
+    assert _cached(cache, ["C", "CC", "CCC", "CCCC"]) == ["C", "CCC", "CCCC"]
+
+    cache.put_many({"N": "N", "O": "O"})
+
+    assert len(cache) == 3
+    assert _cached(cache, ["C", "CCC", "CCCC", "N", "O"]) == ["CCCC", "N",
+                                                              "O"]
+
+
+def test_replacing_entries_keeps_the_count(tmp_path, clock):
+    cache = StandardizationCache(tmp_path / "cache.db", max_entries=3)
+    cache.put_many({"C": "C", "CC": "CC"})
+    cache.put_many({"C": "C", "CC": "CC", "CCC": "CCC"})
+
+    assert len(cache) == 3
+    assert _cached(cache, ["C", "CC", "CCC"]) == ["C", "CC", "CCC"]
+
+    cache.close()
+    assert len(StandardizationCache(tmp_path / "cache.db")) == 3
+
+
+def test_backends_are_cached_apart(tmp_path):
+    cache = StandardizationCache(tmp_path / "cache.db")
+    cache.put_many({"[Na+].[Cl-]": "[Cl-]"}, backend="rdkit")
+
+    assert cache.get_many(["[Na+].[Cl-]"], backend="molvs") == {}
+    assert cache.get_many(["[Na+].[Cl-]"], backend="rdkit") == {
+        "[Na+].[Cl-]": "[Cl-]"}
+
+
+def test_version_change_empties_cache(tmp_path, monkeypatch):
+    cache = StandardizationCache(tmp_path / "cache.db")
+    cache.put_many({"C": "C", "CC": "CC"})
+    cache.close()
+
+    cache = StandardizationCache(tmp_path / "cache.db")
+    assert len(cache) == 2
+    cache.close()
+
+    monkeypatch.setattr(rdkit, "__version__", "0.0.0")
+    cache = StandardizationCache(tmp_path / "cache.db")
+
+    assert len(cache) == 0
+    assert cache.get_many(["C", "CC"]) == {}
+
+
+def test_counts_hits_and_misses(tmp_path):
+    cache = StandardizationCache(tmp_path / "cache.db")
+    assert cache.get_many(["C", "CC"]) == {}
+
+    cache.put_many({"C": "C"})
+    found = cache.get_many(["C", "C", "CC", "CCC"])
+
+    assert found == {"C": "C"}
+    assert cache.stats() == {"hits": 2, "misses": 4, "entries": 1}
@@ -0,0 +1,62 @@
+"""StreamCleaner against DataCleaner.clean on the same file"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import cleaner_dataset
+from core.code.clean_process import DataCleaner
+from core.code.streaming import StreamCleaner
+
+# Small chunks, so duplicates and conflicting labels cross chunk borders
+CHUNK_SIZE = 7
+
+
+def _dataset(task):
+    dataframe = cleaner_dataset(60, duplicate_rate=0.4, invalid_rate=0.1,
+                                seed=3)
+    if task == "Regression":
+        rng = np.random.default_rng(3)
+        dataframe["Labels"] = rng.choice([0.5, 1.0, 2.5], len(dataframe))
+
+    # Same molecule written differently, first and last chunk
+    edges = pd.DataFrame({"Smiles": ["OCC", "CCO", "C1=CC=CC=C1", "c1ccccc1",
+                                     "not a smiles", np.nan],
+                          "ID": np.arange(100, 106),
+                          "Labels": [1, 0, 1, 1, 0, 1]})
+
+    return pd.concat([edges.iloc[[0, 2]], dataframe, edges.iloc[[1, 3, 4, 5]]],
+                     ignore_index=True)
+
+
+@pytest.mark.parametrize("task", ["Classification", "Regression"])
+def test_stream_matches_in_memory(tmp_path, task):
+    dataframe = _dataset(task)
+    input_path = tmp_path / "input.csv"
+    dataframe.to_csv(input_path, index=False)
+
+    stream = StreamCleaner(DataCleaner("Smiles", "Labels"),
+                           chunk_size=CHUNK_SIZE)
+    stream.clean(str(input_path), str(tmp_path / "stream.csv"), task)
+
+    dclean = DataCleaner("Smiles", "Labels")
+    dclean.clean(pd.read_csv(input_path), task).to_csv(
+        tmp_path / "memory.csv", index=False)
+
+    result = pd.read_csv(tmp_path / "stream.csv")
+    expected = pd.read_csv(tmp_path / "memory.csv")
+
+    assert stream.rows_in == len(dataframe)
+    assert stream.rows_out == len(expected)
+    assert len(stream.errors) == len(dclean.errors)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_stream_reads_single_column_csv(tmp_path):
+    input_path = tmp_path / "input.csv"
+    input_path.write_text("Smiles\nCCO\nc1ccccc1\nOCC\n")
+
+    stream = StreamCleaner(DataCleaner("Smiles", "Labels"), chunk_size=2)
+    chunks = list(stream._read_chunks(str(input_path)))
+
+    assert [list(chunk.columns) for chunk in chunks] == [["Smiles"]] * 2
+    assert pd.concat(chunks)["Smiles"].tolist() == ["CCO", "c1ccccc1", "OCC"]
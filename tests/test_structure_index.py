@@ -0,0 +1,98 @@
+"""StructureIndex lookups, buffered additions and corpus updates"""
+import numpy as np
+import pandas as pd
+
+from core.code import structure_index
+from core.code.clean_process import DataCleaner
+from core.code.streaming import StreamCleaner
+from core.code.structure_index import StructureIndex
+
+
+def _saves(monkeypatch):
+    # Paths written by np.save in structure_index
+    saves = []
+    save = structure_index.np.save
+
+    def record(path, array):
+        saves.append(path)
+        save(path, array)
+
+    monkeypatch.setattr(structure_index.np, "save", record)
+
+    return saves
+
+
+def test_empty_index(tmp_path):
+    index = StructureIndex(str(tmp_path / "corpus.npy"))
+
+    assert len(index) == 0
+    assert index.version() == 0.0
+    assert index.contains(["CCO", "c1ccccc1"]).tolist() == [False, False]
+    assert index.contains([]).tolist() == []
+    assert index.flush() == 0
+    assert not (tmp_path / "corpus.npy").exists()
+
+
+def test_add_then_flush(tmp_path):
+    path = str(tmp_path / "corpus.npy")
+    index = StructureIndex(path)
+
+    assert index.add(["CCO", "CCN", "CCO"]) == 2
+    assert index.add(["CCN", "CCC"]) == 2
+    # Buffered until flush
+    assert index.contains(["CCO"]).tolist() == [False]
+
+    assert index.flush() == 3
+    assert index.contains(["CCC", "CCO", "CCCl", "CCN"]).tolist() == [
+        True, True, False, True]
+
+    reopened = StructureIndex(path)
+    assert len(reopened) == 3
+    hashes = np.asarray(reopened.hashes)
+    assert np.array_equal(hashes, np.unique(hashes))
+
+    assert reopened.add(["CCO", "CCN"]) == 0
+    assert reopened.add([]) == 0
+    assert reopened.flush() == 0
+
+
+def test_flush_keeps_compounds_saved_meanwhile(tmp_path):
+    path = str(tmp_path / "corpus.npy")
+    first = StructureIndex(path)
+    second = StructureIndex(path)
+
+    first.add(["CCO"])
+    second.add(["CCN", "CCO"])
+    first.flush()
+
+    assert second.flush() == 1
+    assert StructureIndex(path).contains(["CCO", "CCN"]).tolist() == [
+        True, True]
+
+
+def test_cleaners_save_the_corpus_once(tmp_path, monkeypatch):
+    dataframe = pd.DataFrame({"Smiles": ["CCO", "CCN", "OCC", "CCC",
+                                         "CCCl", "CCN", "CCBr", "CCS"],
+                              "Labels": [1, 0, 1, 1, 0, 0, 1, 0]})
+    input_path = tmp_path / "input.csv"
+    dataframe.to_csv(input_path, index=False)
+    saves = _saves(monkeypatch)
+
+    index = StructureIndex(str(tmp_path / "stream.npy"))
+    stream = StreamCleaner(DataCleaner("Smiles", "Labels", corpus=index,
+                                       update_corpus=True), chunk_size=2)
+    stream.clean(str(input_path), str(tmp_path / "output.csv"),
+                 "Classification")
+    output = pd.read_csv(tmp_path / "output.csv")
+
+    assert len(saves) == 1
+    assert len(StructureIndex(index.path)) == len(output)
+
+    index = StructureIndex(str(tmp_path / "memory.npy"))
+    dclean = DataCleaner("Smiles", "Labels", corpus=index,
+                         update_corpus=True)
+    df = dclean.clean(dataframe, "Classification")
+
+    assert len(saves) == 2
+    assert not df["In Corpus"].any()
+    assert StructureIndex(index.path).contains(df["Smiles"]).all()